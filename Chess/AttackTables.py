@@ -0,0 +1,46 @@
+"""
+Square geometry for GameState, worked out once at import so the move generator and attack tests never redo bounds checks.
+Squares are indexed row * 8 + col and every table entry lists target squares as (col, row) tuples, in the same order as
+board locations elsewhere.
+
+ - KNIGHT_TARGETS[sq], KING_TARGETS[sq]: squares a knight/king on sq attacks
+ - RAYS[sq][j]: the squares outward from sq in DIRECTIONS[j], nearest first, stopping at the edge of the board.
+   Directions 0-3 are orthogonal (rook), 4-7 diagonal (bishop)
+ - PAWN_ATTACKS[color][sq]: squares a pawn of that color on sq attacks
+"""
+
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1))  # (col, row): l, r, u, d, lu, ru, ld, rd
+ORTHOGONALS = range(0, 4)
+DIAGONALS = range(4, 8)
+KNIGHT_JUMPS = ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2))
+
+
+def _targets(sq, steps):
+    c, r = sq & 7, sq >> 3
+    return tuple((c + dc, r + dr) for dc, dr in steps if 0 <= c + dc < 8 and 0 <= r + dr < 8)
+
+
+def _ray(sq, direction):
+    c, r = sq & 7, sq >> 3
+    ray = []
+    for i in range(1, 8):
+        endCol, endRow = c + direction[0] * i, r + direction[1] * i
+        if not (0 <= endCol < 8 and 0 <= endRow < 8):
+            break
+        ray.append((endCol, endRow))
+    return tuple(ray)
+
+
+KNIGHT_TARGETS = tuple(_targets(sq, KNIGHT_JUMPS) for sq in range(64))
+KING_TARGETS = tuple(_targets(sq, DIRECTIONS) for sq in range(64))
+RAYS = tuple(tuple(_ray(sq, d) for d in DIRECTIONS) for sq in range(64))
+PAWN_ATTACKS = {
+    'w': tuple(_targets(sq, ((-1, -1), (1, -1))) for sq in range(64)),  # white pawns capture up the board
+    'b': tuple(_targets(sq, ((-1, 1), (1, 1))) for sq in range(64)),
+}
+
+# the same tables as square indexes, for marking attacked squares
+KNIGHT_SQUARES = tuple(tuple(r * 8 + c for c, r in targets) for targets in KNIGHT_TARGETS)
+KING_SQUARES = tuple(tuple(r * 8 + c for c, r in targets) for targets in KING_TARGETS)
+PAWN_ATTACK_SQUARES = {color: tuple(tuple(r * 8 + c for c, r in targets) for targets in PAWN_ATTACKS[color]) for color in PAWN_ATTACKS}
+RAY_SQUARES = tuple(tuple(tuple(r * 8 + c for c, r in ray) for ray in rays) for rays in RAYS)
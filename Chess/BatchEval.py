@@ -0,0 +1,134 @@
+"""
+Scores many positions at once with NumPy, for offline analysis and tuning.  Positions are an N x 64 int8 array, one row
+per board in square order (row * 8 + col, a8 first), pieces coded as below, and the whole batch is scored in one
+vectorized pass with the same material and piece-square scores as ChessAI.scoreBoard.
+
+    0 empty,  1-6 white pawn, knight, bishop, rook, queen, king,  -1 to -6 the black pieces
+
+Like the incremental score scoreBoard returns, it does not know about checkmate or stalemate.
+
+Usage:  python BatchEval.py FILE          score the FEN/EPD positions in FILE (one per line)
+        python BatchEval.py --check [N]   compare with scoreBoard on N positions from random games, and time both
+"""
+import random
+import sys
+import time
+import numpy as np
+from PieceScores import pieceSquareScores
+
+PIECE_CODES = {"wp": 1, "wN": 2, "wB": 3, "wR": 4, "wQ": 5, "wK": 6, "bp": -1, "bN": -2, "bB": -3, "bR": -4, "bQ": -5, "bK": -6}
+FEN_CODES = {'P': 1, 'N': 2, 'B': 3, 'R': 4, 'Q': 5, 'K': 6, 'p': -1, 'n': -2, 'b': -3, 'r': -4, 'q': -5, 'k': -6}
+
+# SQUARE_SCORES[code + 6][sq]: score of a piece on a square, +ve good for white.  Row 6 (empty) is all 0
+SQUARE_SCORES = np.zeros((13, 64))
+for piece, code in PIECE_CODES.items():
+    SQUARE_SCORES[code + 6] = pieceSquareScores[piece]
+SQUARES = np.arange(64)
+
+
+"""
+A GameState's board as a row of 64 int8 piece codes.
+"""
+def encodeBoard(gs):
+    return np.array([PIECE_CODES.get(square, 0) for row in gs.board for square in row], dtype=np.int8)
+
+
+"""
+The boards of a list of GameStates as an N x 64 int8 array, with an N bool array that is True where white is to move.
+"""
+def encodeGameStates(gameStates):
+    boards = np.zeros((len(gameStates), 64), dtype=np.int8)
+    for i, gs in enumerate(gameStates):
+        boards[i] = encodeBoard(gs)
+    return boards, np.array([gs.whiteToMove for gs in gameStates], dtype=bool)
+
+
+"""
+FEN (or EPD) strings as an N x 64 int8 array and an N bool array of white to move, read straight from the text without
+building GameStates.
+"""
+def encodeFens(fens):
+    boards = np.zeros((len(fens), 64), dtype=np.int8)
+    whiteToMove = np.ones(len(fens), dtype=bool)
+    for i, fen in enumerate(fens):
+        fields = fen.split()
+        sq = 0
+        for char in fields[0]:
+            if char.isdigit():
+                sq += int(char)
+            elif char != "/":
+                boards[i, sq] = FEN_CODES[char]
+                sq += 1
+        whiteToMove[i] = len(fields) < 2 or fields[1] == "w"
+    return boards, whiteToMove
+
+
+"""
+Material + position score of every board, +ve good for white like scoreBoard.  If whiteToMove is given the scores are
+from the side to move's point of view instead (as the negamax search uses them).
+"""
+def scoreBoards(boards, whiteToMove=None):
+    scores = SQUARE_SCORES[boards.astype(np.intp) + 6, SQUARES].sum(axis=1)
+    if whiteToMove is not None:
+        scores = np.where(whiteToMove, scores, -scores)
+    return scores
+
+
+"""
+Positions from random games, for checking and timing.
+"""
+def randomPositions(count, rng=random):
+    from ChessGameState import GameState
+    positions = []
+    while len(positions) < count:
+        gs = GameState()
+        for ply in range(rng.randrange(10, 120)):
+            validMoves = gs.getValidMoves()
+            if not validMoves:
+                break
+            gs.makeMove(rng.choice(validMoves))
+        positions.append(gs)
+    return positions
+
+
+"""
+Scores positions with both scoreBoards and ChessAI.scoreBoard and reports any difference (beyond float rounding:
+scoreBoard adds the same numbers up in a different order) and the time each took.  Returns True if all match.
+"""
+def checkAgainstScoreBoard(gameStates):
+    import ChessAI
+    start = time.time()
+    expected = np.array([ChessAI.scoreBoardFromScratch(gs) for gs in gameStates])
+    loopTime = time.time() - start
+    incremental = np.array([ChessAI.scoreBoard(gs) for gs in gameStates])
+    boards, whiteToMove = encodeGameStates(gameStates)
+    start = time.time()
+    scores = scoreBoards(boards)
+    batchTime = time.time() - start
+    wrong = np.flatnonzero(~np.isclose(scores, expected, rtol=0, atol=1e-9) | ~np.isclose(scores, incremental, rtol=0, atol=1e-9))
+    for i in wrong[:10]:
+        print(f"{gameStates[i].getFen()}: batch {scores[i]:.6f}, scoreBoard {incremental[i]:.6f}, rescan {expected[i]:.6f}")
+    print(f"{len(gameStates)} positions, {len(wrong)} wrong     scoreBoardFromScratch loop: {loopTime:.3f}s     "
+          f"batch: {batchTime:.4f}s     speedup: {loopTime / max(batchTime, 1e-9):.0f}x")
+    return len(wrong) == 0
+
+
+def main(argv):
+    if argv and argv[0] == "--check":
+        count = int(argv[1]) if len(argv) > 1 else 1000
+        return 0 if checkAgainstScoreBoard(randomPositions(count)) else 1
+    if argv:
+        with open(argv[0]) as positionFile:
+            fens = [line.strip() for line in positionFile if line.strip() and not line.startswith("#")]
+        start = time.time()
+        boards, whiteToMove = encodeFens(fens)
+        scores = scoreBoards(boards)
+        print(f"{len(fens)} positions scored in {time.time() - start:.3f}s     mean {scores.mean():.3f}     "
+              f"min {scores.min():.3f}     max {scores.max():.3f}")
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
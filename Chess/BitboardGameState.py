@@ -0,0 +1,347 @@
+"""
+A GameState that generates moves from bitboards.  Each of the 12 piece types has a 64 bit int with a bit set for every
+square it occupies (square = row * 8 + col, so a8 = 0 and h1 = 63), alongside white, black and all-piece occupancy
+masks.  Attacks come from precomputed per-square tables and ray masks, so move generation works on whole sets of
+squares at once instead of comparing board strings square by square.
+
+BitboardGameState has the same public interface as GameState (getValidMoves, makeMove, undoMove, board, ...) and can be
+used in its place.  makeMove/undoMove reuse GameState's to keep the board, undo stack and hash up to date, then toggle the
+bits the move changed.
+"""
+from ChessGameState import GameState
+from Move import Move, WKS, WQS, BKS, BQS
+
+# (col, row) directions: 0-3 are orthogonal (rook), 4-7 are diagonal (bishop).  Each direction is paired with its
+# opposite (0/1, 2/3, 4/5, 6/7) for building the line table.
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (1, -1), (-1, 1))
+ROOK_SLIDES = (0, 1, 2, 3)
+BISHOP_SLIDES = (4, 5, 6, 7)
+KNIGHT_JUMPS = ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2))
+
+
+def _onBoard(c, r):
+    return 0 <= c < 8 and 0 <= r < 8
+
+
+def _jumpTable(jumps):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for dc, dr in jumps:
+            if _onBoard(c + dc, r + dr):
+                mask |= 1 << ((r + dr) * 8 + c + dc)
+        table.append(mask)
+    return table
+
+
+def _rayTable():
+    rays = []
+    for dc, dr in DIRECTIONS:
+        directionRays = []
+        for sq in range(64):
+            r, c = divmod(sq, 8)
+            mask = 0
+            i = 1
+            while _onBoard(c + dc * i, r + dr * i):
+                mask |= 1 << ((r + dr * i) * 8 + c + dc * i)
+                i += 1
+            directionRays.append(mask)
+        rays.append(directionRays)
+    return rays
+
+
+def _betweenTable():
+    # BETWEEN[sq1][sq2]: the squares strictly between sq1 and sq2 if they are on a line, else 0
+    between = [[0] * 64 for sq in range(64)]
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        for dc, dr in DIRECTIONS:
+            mask = 0
+            i = 1
+            while _onBoard(c + dc * i, r + dr * i):
+                target = (r + dr * i) * 8 + c + dc * i
+                between[sq][target] = mask
+                mask |= 1 << target
+                i += 1
+    return between
+
+
+def _lineTable():
+    # LINES[sq1][sq2]: every square on the line through sq1 and sq2 (both included), or 0 if they aren't aligned
+    lines = [[0] * 64 for sq in range(64)]
+    for sq in range(64):
+        for j in range(0, 8, 2):  # one of each pair of opposite directions
+            line = RAYS[j][sq] | RAYS[j + 1][sq] | 1 << sq
+            other = RAYS[j][sq] | RAYS[j + 1][sq]
+            while other:
+                bit = other & -other
+                lines[sq][bit.bit_length() - 1] = line
+                other ^= bit
+    return lines
+
+
+KNIGHT_ATTACKS = _jumpTable(KNIGHT_JUMPS)
+KING_ATTACKS = _jumpTable(DIRECTIONS)
+PAWN_ATTACKS = {'w': _jumpTable(((-1, -1), (1, -1))), 'b': _jumpTable(((-1, 1), (1, 1)))}  # squares a pawn on sq attacks
+RAYS = _rayTable()
+RAY_IS_POSITIVE = [dr * 8 + dc > 0 for dc, dr in DIRECTIONS]  # if so the nearest blocker is the lowest set bit
+LINES = _lineTable()
+BETWEEN = _betweenTable()
+
+RANK_MASKS = [0xFF << (r * 8) for r in range(8)]
+
+
+"""
+Squares attacked by a slider on sq, along the given directions, stopping at (and including) the first blocker.
+"""
+def slidingAttacks(sq, occupied, directions):
+    attacks = 0
+    for j in directions:
+        ray = RAYS[j][sq]
+        blockers = ray & occupied
+        if blockers:
+            if RAY_IS_POSITIVE[j]:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[j][blocker]
+        attacks |= ray
+    return attacks
+
+
+class BitboardGameState(GameState):
+    def __init__(self, fen=None):
+        super().__init__(fen)
+        self.initBitboards()
+
+    """
+    Rebuilds the bitboards from the board.
+    """
+    def initBitboards(self):
+        self.bitboards = {color + piece: 0 for color in "wb" for piece in "pNBRQK"}
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] != "--":
+                    self.bitboards[self.board[r][c]] |= 1 << (r * 8 + c)
+        self.occupancy = {color: 0 for color in "wb"}
+        for piece, bitboard in self.bitboards.items():
+            self.occupancy[piece[0]] |= bitboard
+
+    def loadFen(self, fen):
+        super().loadFen(fen)
+        self.initBitboards()
+
+    """
+    Toggles the bits changed by a move.  Toggling is its own inverse, so the same call applies and reverts a move.
+    """
+    def toggleMove(self, move):
+        bitboards = self.bitboards
+        color = move.pieceMoved[0]
+        fromBit = 1 << (move.startRow * 8 + move.startCol)
+        toBit = 1 << (move.endRow * 8 + move.endCol)
+        bitboards[move.pieceMoved] ^= fromBit
+        bitboards[color + 'Q' if move.isPawnPromotion else move.pieceMoved] ^= toBit
+        self.occupancy[color] ^= fromBit | toBit
+        if move.pieceCaptured != "--":
+            captureBit = 1 << (move.startRow * 8 + move.endCol) if move.isEnpassantMove else toBit
+            bitboards[move.pieceCaptured] ^= captureBit
+            self.occupancy[move.pieceCaptured[0]] ^= captureBit
+        if move.isCastleMove:
+            if move.endCol > move.startCol:  # kingside: rook from the h file to the f file
+                rookBits = 1 << (move.endRow * 8 + 7) | 1 << (move.endRow * 8 + 5)
+            else:  # queenside: rook from the a file to the d file
+                rookBits = 1 << (move.endRow * 8) | 1 << (move.endRow * 8 + 3)
+            bitboards[color + 'R'] ^= rookBits
+            self.occupancy[color] ^= rookBits
+
+    def makeMove(self, move):
+        super().makeMove(move)
+        self.toggleMove(move)
+
+    def undoMove(self):
+        if len(self.moveLog) != 0:
+            move = self.moveLog[-1]
+            super().undoMove()
+            self.toggleMove(move)
+
+    def hasNonPawnMaterial(self):
+        color = 'w' if self.whiteToMove else 'b'
+        return self.occupancy[color] & ~(self.bitboards[color + 'p'] | self.bitboards[color + 'K']) != 0
+
+    """
+    Bitboard of the pieces of color that attack sq, given the occupied squares.  Pieces on excluded squares are ignored
+    (used to test a position where a piece has just been captured).
+    """
+    def attackersOf(self, sq, color, occupied, excluded=0):
+        bitboards = self.bitboards
+        attackers = KNIGHT_ATTACKS[sq] & bitboards[color + 'N']
+        attackers |= PAWN_ATTACKS['b' if color == 'w' else 'w'][sq] & bitboards[color + 'p']
+        attackers |= KING_ATTACKS[sq] & bitboards[color + 'K']
+        rooksQueens = bitboards[color + 'R'] | bitboards[color + 'Q']
+        if rooksQueens:
+            attackers |= slidingAttacks(sq, occupied, ROOK_SLIDES) & rooksQueens
+        bishopsQueens = bitboards[color + 'B'] | bitboards[color + 'Q']
+        if bishopsQueens:
+            attackers |= slidingAttacks(sq, occupied, BISHOP_SLIDES) & bishopsQueens
+        return attackers & ~excluded
+
+    """
+    Determine if the enemy can attack the square r, c.  Returns True, False
+    """
+    def squareUnderAttack(self, r, c):
+        enemyColor = 'b' if self.whiteToMove else 'w'
+        return self.attackersOf(r * 8 + c, enemyColor, self.occupancy['w'] | self.occupancy['b']) != 0
+
+    """
+    Bitboard of the pieces of color that are pinned to their king at kingSq.
+    """
+    def pinnedPieces(self, kingSq, color, occupied):
+        enemyColor = 'b' if color == 'w' else 'w'
+        bitboards = self.bitboards
+        own = self.occupancy[color]
+        pinned = 0
+        for j in range(8):
+            sliders = bitboards[enemyColor + 'Q'] | bitboards[enemyColor + ('R' if j < 4 else 'B')]
+            ray = RAYS[j][kingSq]
+            if not ray & sliders:
+                continue
+            blockers = ray & occupied
+            if RAY_IS_POSITIVE[j]:
+                first = blockers & -blockers
+                second = (blockers ^ first) & -(blockers ^ first)
+            else:
+                first = 1 << (blockers.bit_length() - 1) if blockers else 0
+                rest = blockers ^ first
+                second = 1 << (rest.bit_length() - 1) if rest else 0
+            if first & own and second & sliders:
+                pinned |= first
+        return pinned
+
+    """
+    Checks a move of a piece from fromSq to toSq does not leave the king on kingSq attacked.  captureSq is the square of
+    any captured piece (differs from toSq for en passant).
+    """
+    def leavesKingSafe(self, fromSq, toSq, captureSq, kingSq, enemyColor, occupied):
+        captureBit = 1 << captureSq if captureSq is not None else 0
+        occupiedAfter = (occupied & ~(1 << fromSq) & ~captureBit) | 1 << toSq
+        return not self.attackersOf(kingSq, enemyColor, occupiedAfter, captureBit)
+
+    """
+    The king square, the pieces giving check and our pinned pieces: everything generateMoves needs to know.
+    """
+    def prepareMoveGeneration(self):
+        color, enemyColor = ('w', 'b') if self.whiteToMove else ('b', 'w')
+        occupied = self.occupancy['w'] | self.occupancy['b']
+        kingSq = self.bitboards[color + 'K'].bit_length() - 1
+        checkers = self.attackersOf(kingSq, enemyColor, occupied)
+        self.inCheck = checkers != 0
+        self.pins, self.checks = [], []
+        return kingSq, checkers, self.pinnedPieces(kingSq, color, occupied)
+
+    """
+    Legal moves from a prepared state, see GameState.generateMoves.
+    """
+    def generateMoves(self, prepared, captures=True, quiets=True, fromSquare=None):
+        kingSq, checkers, pinned = prepared
+        self.inCheck = checkers != 0
+        color, enemyColor = ('w', 'b') if self.whiteToMove else ('b', 'w')
+        bitboards, board = self.bitboards, self.board
+        own, enemy = self.occupancy[color], self.occupancy[enemyColor]
+        occupied = own | enemy
+        empty = ~occupied
+        kingBit = 1 << kingSq
+        fromMask = 1 << (fromSquare[1] * 8 + fromSquare[0]) if fromSquare is not None else -1
+        # squares a move of this stage may land on; pawn pushes to the last rank are promotions and go with the captures
+        stageMask = (enemy if captures else 0) | (empty if quiets else 0)
+        promotionRank = RANK_MASKS[0] if color == 'w' else RANK_MASKS[7]
+        pushMask = (promotionRank if captures else 0) | (~promotionRank if quiets else 0)
+        moves = []
+
+        if checkers & (checkers - 1) == 0:  # no more than one checker, so pieces other than the king may move
+            # squares a move must land on: anywhere not our own, or if in check the checker or a square blocking it
+            if checkers:
+                targetMask = checkers | BETWEEN[kingSq][checkers.bit_length() - 1]
+            else:
+                targetMask = ~own
+            append = moves.append
+
+            pawns = bitboards[color + 'p'] & fromMask
+            forward = -8 if color == 'w' else 8
+            startRank = RANK_MASKS[6] if color == 'w' else RANK_MASKS[1]
+            pawnAttacks = PAWN_ATTACKS[color]
+            enpassantBit = 1 << (self.enpassantPossible[1] * 8 + self.enpassantPossible[0]) if self.enpassantPossible != () and captures else 0
+            while pawns:
+                bit = pawns & -pawns
+                pawns ^= bit
+                sq = bit.bit_length() - 1
+                allowed = targetMask & LINES[kingSq][sq] if bit & pinned else targetMask  # pinned pieces may only move along the pin
+                oneStep = sq + forward
+                targets = 0
+                if (1 << oneStep) & empty:
+                    targets = 1 << oneStep
+                    if bit & startRank and (1 << (oneStep + forward)) & empty:
+                        targets |= 1 << (oneStep + forward)
+                    targets &= pushMask
+                if captures:
+                    targets |= pawnAttacks[sq] & enemy
+                targets &= allowed
+                while targets:
+                    target = targets & -targets
+                    targets ^= target
+                    toSq = target.bit_length() - 1
+                    append(Move((sq & 7, sq >> 3), (toSq & 7, toSq >> 3), board))
+                if pawnAttacks[sq] & enpassantBit:  # the en passant capture removes two pawns from a row, so test it directly
+                    toSq = enpassantBit.bit_length() - 1
+                    if self.leavesKingSafe(sq, toSq, (sq & ~7) | (toSq & 7), kingSq, enemyColor, occupied):
+                        append(Move((sq & 7, sq >> 3), (toSq & 7, toSq >> 3), board, isEnpassantMove=True))
+
+            for piece in "NBRQ":
+                pieces = bitboards[color + piece] & fromMask
+                while pieces:
+                    bit = pieces & -pieces
+                    pieces ^= bit
+                    sq = bit.bit_length() - 1
+                    if piece == 'N':
+                        targets = KNIGHT_ATTACKS[sq]
+                    elif piece == 'B':
+                        targets = slidingAttacks(sq, occupied, BISHOP_SLIDES)
+                    elif piece == 'R':
+                        targets = slidingAttacks(sq, occupied, ROOK_SLIDES)
+                    else:
+                        targets = slidingAttacks(sq, occupied, ROOK_SLIDES) | slidingAttacks(sq, occupied, BISHOP_SLIDES)
+                    targets &= stageMask & targetMask
+                    if bit & pinned:
+                        targets &= LINES[kingSq][sq]
+                    while targets:
+                        target = targets & -targets
+                        targets ^= target
+                        toSq = target.bit_length() - 1
+                        append(Move((sq & 7, sq >> 3), (toSq & 7, toSq >> 3), board))
+
+        if not kingBit & fromMask:
+            return moves
+
+        # king moves: the target must not be attacked once the king has left its square
+        occupiedWithoutKing = occupied ^ kingBit
+        targets = KING_ATTACKS[kingSq] & stageMask
+        while targets:
+            target = targets & -targets
+            targets ^= target
+            toSq = target.bit_length() - 1
+            if not self.attackersOf(toSq, enemyColor, occupiedWithoutKing, target):
+                moves.append(Move((kingSq & 7, kingSq >> 3), (toSq & 7, toSq >> 3), board))
+
+        # castling: same rules as GameState.getCastleMoves
+        if quiets and not self.inCheck:
+            row = 7 if color == 'w' else 0
+            if kingSq == row * 8 + 4:
+                rights = self.castleRights
+                kingside, queenside = (rights & WKS, rights & WQS) if color == 'w' else (rights & BKS, rights & BQS)
+                if kingside and not occupied & (0b11 << (row * 8 + 5)):
+                    if not self.attackersOf(row * 8 + 5, enemyColor, occupied) and not self.attackersOf(row * 8 + 6, enemyColor, occupied):
+                        moves.append(Move((4, row), (6, row), board, isCastleMove=True))
+                if queenside and not occupied & (0b111 << (row * 8 + 1)):
+                    if not self.attackersOf(row * 8 + 3, enemyColor, occupied) and not self.attackersOf(row * 8 + 2, enemyColor, occupied):
+                        moves.append(Move((4, row), (2, row), board, isCastleMove=True))
+        return moves
@@ -1,17 +1,51 @@
+import logging
+import multiprocessing
+import os
 import random
 import time
 from PieceScores import *
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE
+from MoveOrdering import MoveOrdering, captureScore
+from Move import Move
+from OpeningBook import OpeningBook
+import Tablebase
+from SearchStats import SearchStats
+import SearchProfiler
 
-CHECKMATE = 1000
+CHECKMATE = 1000  # being mated scores -(CHECKMATE - plies from the root), so a nearer mate scores further from 0
+MATE_THRESHOLD = CHECKMATE - 500  # scores beyond +-MATE_THRESHOLD are mates; the evaluation never comes near it
 STALEMATE = 0
-WhiteDepth = 4
-BlackDepth = 4
-nextMove = None
-counter = 0
+WhiteDepth = 6  # maximum search depth for each side
+BlackDepth = 6
+WhiteTimeLimit = 10  # seconds each side may think for a move
+BlackTimeLimit = 10
+TIME_SEARCH = False  # True: measure move generation and evaluation time in the stats (slows the search a little)
+STATS_LOG = None  # path of a file each search's stats are appended to as a line of JSON, None = not written
+logger = logging.getLogger("ChessAI")  # iterations and search summaries are logged at INFO level
+PROFILE_SEARCH = False  # True: profile every search and write a report and flamegraph stacks, see SearchProfiler.py
+CHECK_EVAL = False  # True: verify the incremental board score against a full rescan at every leaf (slow, for debugging)
+TT_SIZE_MB = 32  # memory budget of the transposition table of a SearchContext
+SEARCH_WORKERS = 1  # processes searching the root moves in parallel (unless a SearchContext sets its own).  1 = single process, deterministic
+USE_OPENING_BOOK = True  # play moves from the opening book without searching while the position is in it
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books", "book.bin")
+openingBook = None  # opened on first use, see getOpeningBook
+USE_TABLEBASES = True  # play and score positions covered by the endgame tablebases in tablebases/ perfectly
+USE_PVS = True  # principal variation search: moves after the first are searched with a null window, see findMoveNegaMaxAlphaBeta
+NULL_WINDOW = 0.001  # width of a null window, less than the smallest difference between two scores
+ASPIRATION_WINDOW = 0.5  # each iteration from depth 2 starts with a window this wide either side of the last score, None = full window
+ASPIRATION_GROWTH = 4  # the window is widened this many times after the score falls outside it
+MAX_PLY = 128  # longest principal variation tracked
+USE_NULL_MOVE = True  # null move pruning, see findMoveNegaMaxAlphaBeta
+NULL_MOVE_REDUCTION = 2  # the null move is searched this many plies shallower than a move
+USE_LMR = True  # late move reductions, see findMoveNegaMaxAlphaBeta
+LMR_MIN_DEPTH = 3  # nodes at least this deep reduce their late moves
+LMR_FULL_MOVES = 3  # moves searched to full depth before later quiet moves are reduced
+LMR_REDUCTION = 1  # plies a late move is reduced by
 
 
 """
 Score board.  +ve score is good for white, -ve score is good for black.
+The material and position score is kept up to date by makeMove/undoMove in gs.boardScore.
 """
 def scoreBoard(gs):
     if gs.checkMate:
@@ -21,6 +55,17 @@ def scoreBoard(gs):
             return CHECKMATE  # white wins
     elif gs.staleMate:
         return STALEMATE
+    if CHECK_EVAL:
+        fullScore = scoreBoardFromScratch(gs)
+        if abs(fullScore - gs.boardScore) > 1e-9:
+            raise AssertionError(f"incremental score {gs.boardScore} != rescanned score {fullScore} in {gs.getFen()}")
+    return gs.boardScore
+
+
+"""
+Scores the board by scanning every square.  Used to check the incremental score.
+"""
+def scoreBoardFromScratch(gs):
     score = 0
     for row in range(len(gs.board)):
         for col in range(len(gs.board[row])):
@@ -37,75 +82,615 @@ def scoreBoard(gs):
 
 
 """
-The function that is called by ChessMain
+Limits on a search.  A limit left as None is not applied.
+maxDepth: deepest iteration to search.
+timeLimit: wall clock budget in seconds.  No new iteration is started once half of it has gone (the next would not
+finish in time), and the search is stopped when it runs out.
+moveTime: search for this many seconds, starting new iterations until the time is up.
+maxNodes: stop after searching this many nodes.
 """
-def findBestMove(gs, validMoves, returnQueue):
-    global nextMove, counter, WhiteDepth, BlackDepth
-    startTime = time.time()
-    nextMove, counter = None, 0
-    depth = WhiteDepth if gs.whiteToMove else BlackDepth
-    validMoves.sort(reverse=True, key=lambda move: moveSortAlgo(move, gs))
-    bestScore = findMoveNegaMaxAlphaBeta(gs, validMoves, depth, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1, True if gs.whiteToMove else False)  # alpha = current max, so start lowest;  beta = current min so start hightest
-    endTime = time.time()
-    print(f"movesSearched: {counter}     maxScore: {bestScore:.3f}     Time: {endTime - startTime:.2f}")
-    returnQueue.put(nextMove)
+class SearchLimits:
+    def __init__(self, maxDepth=None, timeLimit=None, moveTime=None, maxNodes=None):
+        self.maxDepth = maxDepth
+        self.timeLimit = timeLimit
+        self.moveTime = moveTime
+        self.maxNodes = maxNodes
 
 
-""""
-Function to sort valid moves before they are passed into alpha-beta pruning.
-Likely strongest moves should be searched first for better pruning efficiency
 """
-def moveSortAlgo(move, gameState):
-    score = 0
+Raised inside the search when a time or node limit runs out.
+"""
+class SearchTimeout(Exception):
+    pass
 
-    if move.pieceCaptured != "--":
-        score += 10 * pieceScore[move.pieceCaptured[1]] - pieceScore[move.pieceMoved[1]]
 
-    if gameState.squareUnderAttack(move.endRow, move.endCol):
-        if move.pieceCaptured == "--":
-            score -= pieceScore[move.pieceMoved[1]]  # if a capture, already handled
+"""
+The side to move's WhiteDepth/BlackDepth and WhiteTimeLimit/BlackTimeLimit.
+"""
+def defaultLimits(gs):
+    return SearchLimits(maxDepth=WhiteDepth if gs.whiteToMove else BlackDepth,
+                        timeLimit=WhiteTimeLimit if gs.whiteToMove else BlackTimeLimit)
 
-    if move.pieceCaptured == "--" and gameState.squareUnderAttack(move.startRow, move.startCol):
-        score += pieceScore[move.pieceMoved[1]] * 0.5
 
-    if move.isPawnPromotion:
-        score += pieceScore['Q'] - pieceScore['P']
+"""
+Opens the opening book at BOOK_PATH the first time it is needed.  Returns None if there is no book file.
+"""
+def getOpeningBook():
+    global openingBook
+    if openingBook is None and os.path.exists(BOOK_PATH):
+        openingBook = OpeningBook(BOOK_PATH)
+    return openingBook
 
-    if move.pieceCaptured == "--":
-        centerDistance = abs(3.5 - move.endRow) + abs(3.5 - move.endCol)
-        score += (7 - centerDistance) * 0.1
 
-    return score
+"""
+The state of a search: its limits and stats, the best root move found so far, and its own transposition table, killer
+moves, history table and parallel search workers, which are kept between searches so a context that follows one game
+searches it with warm tables.  Contexts share nothing, so several positions can be searched at once in one process (e.g.
+one context per thread, or per game in an analysis server); a context runs one search at a time.
+findBestMove, searchBestMove, getPrincipalVariation and updateSearchLimits use the module's default context,
+see getDefaultContext.
+ttSizeMB defaults to TT_SIZE_MB and workers to SEARCH_WORKERS.
+"""
+class SearchContext:
+    def __init__(self, ttSizeMB=None, workers=None):
+        self.transpositionTable = TranspositionTable(ttSizeMB if ttSizeMB is not None else TT_SIZE_MB)
+        self.moveOrdering = MoveOrdering()  # killer moves and history table
+        self.workers = workers
+        self.limits = None  # limits of the running search, see updateLimits
+        self.deadline = None  # time.time() at which the search is stopped
+        self.nodeLimit = None
+        self.startTime = 0
+        self.stopCheck = None  # optional function polled during the search; the search stops when it returns True
+        self.stats = SearchStats()  # statistics of the running (or last) search, see SearchStats.py
+        self.nextMove = None  # best root move of the current iteration
+        self.rootDepth = 0  # depth of the current iteration, so the search knows which node is the root
+        self.rootPly = 0  # length of the move log at the root, so the search knows the ply of a node
+        self.depthReached = 0  # depth of the last completed iteration
+        self.pv = []  # principal variation of the last completed iteration, as Moves
+        self.pvTable = [()] * (MAX_PLY + 1)  # pvTable[ply]: best line found from the node being searched at ply
+        self.tablebasePieces = 0  # positions with at most this many pieces are probed in the search, 0 = none
+        self.workerNodes = {}  # nodes searched by each process in the last search, keyed by "main" or the worker's pid
+        self.pool = None  # the parallel search workers
+        self.poolSize = 0
+        self.sharedAlpha = None  # best root score so far, shared with the workers
+        self.stopFlag = None  # set to 1 to stop the workers' searches
+        self.searchId = 0  # tells a worker that a new search has started
 
+    """
+    Searches with iterative deepening: depth 1, 2, 3... until a limit runs out, each iteration searching the previous
+    iteration's best move first.  Returns the best move of the deepest completed iteration and the search's SearchStats.
+    limits defaults to the side's WhiteDepth/BlackDepth and WhiteTimeLimit/BlackTimeLimit.
+    onIteration, if given, is called after every completed iteration with (depth, move, score, nodes, seconds).
+    shouldStop, if given, is polled along with the limits and stops the search when it returns True (e.g. a "stop"
+    command).  A position in the opening book or the endgame tablebases is answered from them without searching.
+    With PROFILE_SEARCH set the search is profiled by SearchProfiler.
+    """
+    def search(self, gs, validMoves, limits=None, onIteration=None, shouldStop=None):
+        if PROFILE_SEARCH:
+            return SearchProfiler.profileSearch(self.runSearch, gs, validMoves, limits, onIteration, shouldStop)
+        return self.runSearch(gs, validMoves, limits, onIteration, shouldStop)
 
-"""
-findNegaMaxAlphaBeta.  Always find the maximum score for black and white.
-Alpha = Best score the current player has found so far (starts at -1000)
-Beta = Best score the opponent has found so far (starts at +1000)
-When beta < alpha, the maximizing player need not consider further descendants of this node, as opponent player won't let them reach it in real play.
-"""
-def findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, turnMultiplier, whiteAI):
-    global nextMove, counter, WhiteDepth, BlackDepth
-    counter += 1
-    if depth == 0:
-        return turnMultiplier * scoreBoard(gs)
-
-    maxScore = -CHECKMATE # worst scenario
-    for move in validMoves:
-        gs.makeMove(move)
-        nextMoves = gs.getValidMoves()
-        score = -findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1, -beta, -alpha, -turnMultiplier, whiteAI)  # switch the alpha beta perspective.
-        if score > maxScore:
-            maxScore = score
-            if (depth == WhiteDepth and whiteAI) or (depth == BlackDepth and not whiteAI):
-                nextMove = move
-                print(nextMove.moveID, f"{maxScore:.3f}")
+    def runSearch(self, gs, validMoves, limits=None, onIteration=None, shouldStop=None):
+        if limits is None:
+            limits = defaultLimits(gs)
+        stats = self.stats = SearchStats(TIME_SEARCH)
+        self.startTime = startTime = stats.startTime
+        self.nextMove, self.depthReached, self.pv = None, 0, []
+        self.workerNodes = {}
+        self.transpositionTable.newSearch()
+        self.moveOrdering.newSearch()
+        self.updateLimits(limits)
+        self.stopCheck = shouldStop
+
+        if not validMoves:  # checkmated or stalemated: nothing to search
+            return self.finish(None, -CHECKMATE if gs.kingInCheck() else STALEMATE, 0)
+
+        book = getOpeningBook() if USE_OPENING_BOOK else None
+        bookMove = book.probe(gs, validMoves) if book is not None else None
+        if bookMove is not None:
+            stats.source = "book"
+            self.pv = [bookMove]
+            return self.finish(bookMove, None, 0)
+
+        self.tablebasePieces = Tablebase.largestTable() if USE_TABLEBASES else 0
+        if gs.pieceCount <= self.tablebasePieces:
+            tablebaseMove, value = Tablebase.bestMove(gs, validMoves)
+            if tablebaseMove is not None:
+                stats.source = "tablebase"
+                logger.info(f"tablebase: {Tablebase.describe(value)}")
+                self.pv = [tablebaseMove]
+                return self.finish(tablebaseMove, tablebaseScore(value, 0), 0)
+
+        workers = self.workers if self.workers is not None else SEARCH_WORKERS
+        self.rootPly = len(gs.moveLog)
+        rootMoves = list(validMoves)
+        self.moveOrdering.sortMoves(rootMoves, 0)
+        bestMove, bestScore = (rootMoves[0] if rootMoves else None), 0
+        turnMultiplier = 1 if gs.whiteToMove else -1
+        depth = 0
+        while depth < (self.limits.maxDepth if self.limits.maxDepth is not None else 64):
+            depth += 1
+            self.rootDepth, self.nextMove = depth, None
+            nodesBefore = stats.nodes
+            try:
+                if workers > 1 and len(rootMoves) > 1:
+                    score = self.findMoveParallel(gs, rootMoves, depth, turnMultiplier, workers)
+                else:
+                    score = self.searchRoot(gs, rootMoves, depth, bestScore if depth > 1 else None, turnMultiplier)
+            except SearchTimeout:
+                while len(gs.moveLog) > self.rootPly:  # the search was abandoned part way down a line
+                    if gs.moveLog[-1] is None:
+                        gs.undoNullMove()
+                    else:
+                        gs.undoMove()
+                break
+            if self.nextMove is not None:
+                bestMove, bestScore = self.nextMove, score
+                rootMoves.insert(0, rootMoves.pop(rootMoves.index(bestMove)))  # search it first next iteration
+                self.pv = self.completePrincipalVariation(gs, depth)
+            self.depthReached = depth
+            stats.nodesPerDepth.append(stats.nodes - nodesBefore)
+            elapsed = time.time() - startTime
+            logger.info(f"depth: {depth}     move: {bestMove.moveID if bestMove else None}     score: {bestScore:.3f}     movesSearched: {stats.nodes}     Time: {elapsed:.2f}     "
+                        f"pv: {' '.join(move.getChessNotation() for move in self.pv)}")
+            if onIteration is not None:
+                onIteration(depth, bestMove, bestScore, stats.nodes, elapsed)
+            if abs(bestScore) >= MATE_THRESHOLD or len(rootMoves) <= 1:  # found a forced mate, or no choice to make
+                break
+            if self.limits.moveTime is None and self.limits.timeLimit is not None and elapsed > self.limits.timeLimit / 2:
+                break  # the next iteration would not finish in time
+            if self.nodeLimit is not None and stats.nodes >= self.nodeLimit:
+                break
+
+        if self.workerNodes:
+            stats.workerNodes = {"main": stats.nodes - sum(self.workerNodes.values()), **self.workerNodes}
+        return self.finish(bestMove, bestScore, self.depthReached)
+
+    """
+    Completes the stats of the search, logs them and appends them to STATS_LOG.  Returns (bestMove, stats).
+    """
+    def finish(self, bestMove, score, depth):
+        stats = self.stats
+        stats.finish(bestMove, score, depth, self.pv)
+        logger.info(f"{stats.source}: " + stats.summary())
+        if STATS_LOG is not None:
+            with open(STATS_LOG, "a") as statsFile:
+                statsFile.write(stats.toJson() + "\n")
+        return bestMove, stats
+
+    """
+    One iteration of the single process root search.  From depth 2 the root is searched with an aspiration window of
+    ASPIRATION_WINDOW either side of the previous iteration's score, which is usually close and lets more of the tree be
+    cut off.  A score outside the window is only a bound, so the window is widened ASPIRATION_GROWTH times on the side the
+    score fell and the root searched again until the score is inside it.  Sets nextMove and returns the score.
+    """
+    def searchRoot(self, gs, rootMoves, depth, previousScore, turnMultiplier):
+        alpha, beta = -CHECKMATE, CHECKMATE  # alpha = current max, so start lowest;  beta = current min so start hightest
+        delta = ASPIRATION_WINDOW
+        if previousScore is not None and delta:
+            alpha, beta = max(previousScore - delta, -CHECKMATE), min(previousScore + delta, CHECKMATE)
+        while True:
+            self.nextMove, self.pvTable[0] = None, ()
+            score = self.findMoveNegaMaxAlphaBeta(gs, rootMoves, depth, alpha, beta, turnMultiplier)
+            if score <= alpha and alpha > -CHECKMATE:  # failed low: every move may be worse than the score says
+                delta *= ASPIRATION_GROWTH
+                alpha = max(previousScore - delta, -CHECKMATE)
+            elif score >= beta and beta < CHECKMATE:  # failed high: the best move may be better still
+                delta *= ASPIRATION_GROWTH
+                beta = min(previousScore + delta, CHECKMATE)
+                rootMoves.insert(0, rootMoves.pop(rootMoves.index(self.nextMove)))  # search the move that failed high first
+            else:
+                return score
+            self.stats.aspirationResearches += 1
+
+    """
+    Sets the limits of the search, and can change them while it runs (e.g. from a shouldStop callback when a ponder
+    search becomes a normal search).  Time limits are counted from the start of the search.
+    """
+    def updateLimits(self, limits):
+        self.limits = limits
+        budget = limits.moveTime if limits.moveTime is not None else limits.timeLimit
+        self.deadline = self.startTime + budget if budget is not None else None
+        self.nodeLimit = limits.maxNodes
+
+    """
+    The principal variation: the line of best moves stored in the transposition table from this position, up to
+    maxLength moves.  Each move is checked to be legal before it is followed.  gs is left unchanged.
+    """
+    def principalVariation(self, gs, maxLength=16):
+        pv = []
+        seen = set()
+        while len(pv) < maxLength and gs.zobristKey not in seen:
+            seen.add(gs.zobristKey)
+            entry = self.transpositionTable.probe(gs.zobristKey)
+            if entry is None or entry[3] == NO_MOVE:
+                break
+            move = next((move for move in gs.getValidMoves() if move.packed == entry[3]), None)
+            if move is None:
+                break
+            pv.append(move)
+            gs.makeMove(move)
+        for move in pv:
+            gs.undoMove()
+        return pv
+
+    """
+    The principal variation of the iteration just finished: the line tracked in pvTable, which ends early where a PV node
+    was answered by the transposition table, carried on from the table up to depth moves.
+    """
+    def completePrincipalVariation(self, gs, depth):
+        pv = list(self.pvTable[0]) if self.pvTable[0] and self.pvTable[0][0] == self.nextMove else [self.nextMove]
+        if len(pv) < depth:
+            for move in pv:
+                gs.makeMove(move)
+            tail = self.principalVariation(gs, depth - len(pv))
+            for move in pv:
+                gs.undoMove()
+            pv += tail
+        return pv
+
+    """
+    Forgets everything learned from earlier searches, for a new game.
+    """
+    def clear(self):
+        self.transpositionTable.clear()
+        self.moveOrdering.clear()
+
+    """
+    Replaces the transposition table with an empty one of sizeMB.
+    """
+    def resizeTable(self, sizeMB):
+        self.transpositionTable = TranspositionTable(sizeMB)
+
+    """
+    Stops the parallel search workers.  They are started again if a later search needs them.
+    """
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool, self.poolSize = None, 0
+
+    """
+    Nodes searched so far in this search, by this process and any parallel search workers.
+    """
+    def totalNodes(self):
+        return self.stats.nodes
+
+    def getPool(self, workers):
+        if self.pool is None or self.poolSize != workers:
+            self.close()
+            self.sharedAlpha = multiprocessing.Value('d', 0.0, lock=False)
+            self.stopFlag = multiprocessing.Value('b', 0, lock=False)
+            self.pool = multiprocessing.Pool(workers, initializer=initSearchWorker, initargs=(self.sharedAlpha, self.stopFlag))
+            self.poolSize = workers
+        return self.pool
+
+    """
+    One iteration of the root search spread over worker processes, young brothers wait style: the first (expected best)
+    move is searched here to get an alpha bound, then the other moves are searched by the workers in parallel, each with
+    the best score found so far as its alpha.  A move that scores no better than the alpha it was searched with can't be
+    the best move.  Sets nextMove and returns the best score, or raises SearchTimeout if a limit ran out.  The order
+    results come back in varies, so unlike the single process search this is not deterministic.
+    """
+    def findMoveParallel(self, gs, rootMoves, depth, turnMultiplier, workers):
+        pool = self.getPool(workers)
+        ply = len(gs.moveLog) - self.rootPly + 1
+        gs.makeMove(rootMoves[0])
+        self.pvTable[ply] = ()
+        bestScore = -self.findMoveNegaMaxAlphaBeta(gs, None, depth - 1, -CHECKMATE, CHECKMATE, -turnMultiplier)
         gs.undoMove()
+        self.nextMove = rootMoves[0]
+        self.pvTable[0] = (rootMoves[0],) + self.pvTable[ply]
+
+        self.searchId += 1
+        self.sharedAlpha.value, self.stopFlag.value = bestScore, 0
+        fen = gs.getFen()
+        movesByPacked = {move.packed: move for move in rootMoves}
+        tasks = [(self.searchId, fen, type(gs), move.packed, depth, self.deadline) for move in rootMoves[1:]]
+        results = pool.imap_unordered(searchRootMove, tasks)
+        stopped = False
+        for i in range(len(tasks)):
+            while True:
+                try:
+                    packed, score, workerStats, worker, pv = results.next(timeout=0.01)
+                    break
+                except multiprocessing.TimeoutError:  # still waiting: check the limits for the workers
+                    if not stopped and ((self.deadline is not None and time.time() >= self.deadline) or
+                                        (self.nodeLimit is not None and self.totalNodes() >= self.nodeLimit) or
+                                        (self.stopCheck is not None and self.stopCheck())):
+                        self.stopFlag.value, stopped = 1, True
+            self.workerNodes[worker] = self.workerNodes.get(worker, 0) + workerStats.nodes
+            self.stats.add(workerStats)
+            if score is None:
+                stopped = True
+            elif score > bestScore:
+                bestScore, self.nextMove = score, movesByPacked[packed]
+                self.pvTable[0] = (self.nextMove,) + tuple(Move.fromPacked(move) for move in pv)
+                self.sharedAlpha.value = bestScore
+        if stopped:
+            raise SearchTimeout()
+        return bestScore
+
+    """
+    findNegaMaxAlphaBeta.  Always find the maximum score for black and white.
+    Alpha = Best score the current player has found so far (starts at -1000)
+    Beta = Best score the opponent has found so far (starts at +1000)
+    When beta < alpha, the maximizing player need not consider further descendants of this node, as opponent player won't let them reach it in real play.
+    Results are stored in the transposition table; a stored result that is deep enough ends the search of a repeated
+    position early, and the stored best move is searched first.  validMoves is None below the root: the moves are only
+    generated if the transposition table can't answer, captures ordered by MVV-LVA and quiet moves by killers and
+    history (MoveOrdering.py).  A quiet move that causes a cutoff is recorded as a killer and in the history table.  An
+    ending the tablebases cover (Tablebase.py) is scored from them without searching.  Mates, found by the search or in
+    the tablebases, score CHECKMATE less the plies from the root to the mate, so the quickest win is preferred and a lost
+    position is dragged out; the transposition table keeps them counted from the position stored (scoreToTable).
+    With USE_PVS, a node whose window is wider than a null window (a PV node) searches its first move with the full
+    window and the others with a null window around alpha, which only proves whether a move is better than alpha; a move
+    that turns out better is searched again with the full window.  The best line found from each PV node is kept in
+    pvTable.
+    Nodes outside the principal variation are pruned and reduced:
+     - null move pruning (USE_NULL_MOVE): if the side to move is not in check and already scores at least beta, it passes
+       and the opponent's reply is searched NULL_MOVE_REDUCTION plies shallower.  If passing still scores at least beta,
+       a real move would too (moving is nearly always better than passing), so the node is cut off.  This is not tried
+       twice in a row, nor when the side to move has only pawns, where zugzwang makes passing the better option.
+     - late move reductions (USE_LMR): quiet moves ordered after the first LMR_FULL_MOVES, from a node not in check
+       and that don't give check, are searched LMR_REDUCTION plies shallower with a null window.  A move that scores
+       above alpha all the same is searched again to full depth.
+    """
+    def findMoveNegaMaxAlphaBeta(self, gs, validMoves, depth, alpha, beta, turnMultiplier):
+        stats = self.stats
+        stats.nodes += 1
+        if stats.nodes & 1023 == 0:  # check the limits every 1024 nodes
+            if (self.deadline is not None and time.time() >= self.deadline) or \
+                    (self.nodeLimit is not None and stats.nodes >= self.nodeLimit) or \
+                    (self.stopCheck is not None and self.stopCheck()):
+                raise SearchTimeout()
+        ply = len(gs.moveLog) - self.rootPly
+        if gs.pieceCount <= self.tablebasePieces and depth != self.rootDepth:  # an ending the tablebases have solved
+            value = Tablebase.probe(gs)
+            if value is not None:
+                return tablebaseScore(value, ply)
+        if depth == 0:
+            if stats.timed:
+                start = time.perf_counter()
+                score = turnMultiplier * scoreBoard(gs)
+                stats.evalTime += time.perf_counter() - start
+                return score
+            return turnMultiplier * scoreBoard(gs)
+
+        isRoot = depth == self.rootDepth
+        alphaOriginal = alpha
+        transpositionTable = self.transpositionTable
+        ttEntry = transpositionTable.probe(gs.zobristKey)
+        stats.ttProbes += 1
+        ttMove = NO_MOVE
+        if ttEntry is not None:
+            stats.ttHits += 1
+            ttDepth, ttBound, ttScore, ttMove = ttEntry
+            if ttDepth >= depth and not isRoot:
+                ttScore = scoreFromTable(ttScore, ply)
+                if ttBound == EXACT:
+                    stats.ttCutoffs += 1
+                    return ttScore
+                elif ttBound == LOWER_BOUND:
+                    alpha = max(alpha, ttScore)
+                elif ttBound == UPPER_BOUND:
+                    beta = min(beta, ttScore)
+                if alpha >= beta:
+                    stats.ttCutoffs += 1
+                    return ttScore
+
+        pvNode = beta - alpha > 2 * NULL_WINDOW
+        if USE_NULL_MOVE and not pvNode and not isRoot and depth > NULL_MOVE_REDUCTION and gs.moveLog[-1] is not None \
+                and turnMultiplier * gs.boardScore >= beta and gs.hasNonPawnMaterial() and not gs.kingInCheck():
+            gs.makeNullMove()
+            score = -self.findMoveNegaMaxAlphaBeta(gs, None, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + NULL_WINDOW, -turnMultiplier)
+            gs.undoNullMove()
+            if score >= beta:
+                stats.nullMovePrunes += 1
+                return score if score < MATE_THRESHOLD else beta  # a mate found after passing is not to be trusted
+
+        moveOrdering = self.moveOrdering
+        if validMoves is None:  # below the root: generate lazily, best move from last time first, then captures, then quiets
+            validMoves = gs.getStagedMoves(ttMove if ttMove != NO_MOVE else None, captureScore,
+                                           lambda move: moveOrdering.quietScore(move, ply))
+            if stats.timed:
+                validMoves = timedMoves(validMoves, stats)
+        elif ttMove != NO_MOVE:  # search the best move from last time first
+            for i in range(len(validMoves)):
+                if validMoves[i].packed == ttMove:
+                    validMoves.insert(0, validMoves.pop(i))
+                    break
+
+        maxScore = -CHECKMATE # worst scenario
+        bestMove = None
+        movesSearched = 0
+        nullWindow = pvNode and USE_PVS
+        reduceLate = USE_LMR and depth >= LMR_MIN_DEPTH and not isRoot
+        pvTable = self.pvTable
+        for move in validMoves:
+            movesSearched += 1
+            if movesSearched == 1:
+                reduceLate = reduceLate and not gs.inCheck  # the moves have been generated, so inCheck is this node's
+            gs.makeMove(move)
+            pvTable[ply + 1] = ()
+            if movesSearched == 1:
+                score = -self.findMoveNegaMaxAlphaBeta(gs, None, depth-1, -beta, -alpha, -turnMultiplier)  # switch the alpha beta perspective.
+            else:
+                fullDepth = True
+                if reduceLate and movesSearched > LMR_FULL_MOVES and move.pieceCaptured == "--" and not move.isPawnPromotion \
+                        and not gs.kingInCheck():
+                    stats.lateMoveReductions += 1
+                    score = -self.findMoveNegaMaxAlphaBeta(gs, None, depth - 1 - LMR_REDUCTION, -alpha - NULL_WINDOW, -alpha, -turnMultiplier)
+                    fullDepth = score > alpha
+                    if fullDepth:
+                        stats.lmrResearches += 1
+                if fullDepth and nullWindow:
+                    score = -self.findMoveNegaMaxAlphaBeta(gs, None, depth-1, -alpha - NULL_WINDOW, -alpha, -turnMultiplier)
+                    if alpha < score < beta:  # better than alpha: search again for its exact score
+                        stats.researches += 1
+                        pvTable[ply + 1] = ()
+                        score = -self.findMoveNegaMaxAlphaBeta(gs, None, depth-1, -beta, -alpha, -turnMultiplier)
+                elif fullDepth:
+                    score = -self.findMoveNegaMaxAlphaBeta(gs, None, depth-1, -beta, -alpha, -turnMultiplier)
+            if score > maxScore:
+                maxScore = score
+                bestMove = move
+                if isRoot:
+                    self.nextMove = move
+                if pvNode and alpha < score < beta:
+                    pvTable[ply] = (move,) + pvTable[ply + 1]
+            gs.undoMove()
+
+            alpha = max(maxScore, alpha)  # pruning
+            if beta <= alpha:  # we can stop searching here because opponent has already found a position limiting us to beta so will never let us reach this position in real play.
+                moveOrdering.storeCutoff(move, ply, depth)
+                stats.betaCutoffs += 1
+                if movesSearched == 1:
+                    stats.firstMoveCutoffs += 1
+                break
+
+        if movesSearched == 0:  # no legal moves: checkmate or stalemate
+            maxScore = -(CHECKMATE - ply) if gs.inCheck else STALEMATE
+        else:
+            stats.interiorNodes += 1
+
+        if maxScore <= alphaOriginal:
+            bound = UPPER_BOUND
+        elif maxScore >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        transpositionTable.store(gs.zobristKey, depth, bound, scoreToTable(maxScore, ply),
+                                 bestMove.packed if bestMove is not None else NO_MOVE)
+        return maxScore
+
+
+defaultContext = None  # the context of the module functions below, created on first use
 
-        alpha = max(maxScore, alpha)  # pruning
-        if beta <= alpha:  # we can stop searching here because opponent has already found a position limiting us to beta so will never let us reach this position in real play.
-            break
-    return maxScore
+
+"""
+The context the module functions search with.  Created on first use so importing the module (in the GUI, the UCI engine,
+tournament and pool workers, which all make their own) does not allocate a transposition table.
+"""
+def getDefaultContext():
+    global defaultContext
+    if defaultContext is None:
+        defaultContext = SearchContext()
+    return defaultContext
+
+
+"""
+The function that is called by ChessMain: puts the best move found by searchBestMove on returnQueue.
+"""
+def findBestMove(gs, validMoves, returnQueue, limits=None, onIteration=None, shouldStop=None):
+    bestMove, stats = searchBestMove(gs, validMoves, limits, onIteration, shouldStop)
+    returnQueue.put(bestMove)
+
+
+"""
+Searches gs with the default context, see SearchContext.search.  Returns (bestMove, stats).
+"""
+def searchBestMove(gs, validMoves, limits=None, onIteration=None, shouldStop=None):
+    return getDefaultContext().search(gs, validMoves, limits, onIteration, shouldStop)
+
+
+def updateSearchLimits(limits):
+    getDefaultContext().updateLimits(limits)
+
+
+def getPrincipalVariation(gs, maxLength=16):
+    return getDefaultContext().principalVariation(gs, maxLength)
+
+
+def totalNodes():
+    return getDefaultContext().totalNodes()
+
+
+workerContext = None  # a search worker's own context, see initSearchWorker
+workerSearchId = None
+
+
+def initSearchWorker(alpha, stop):
+    global workerContext
+    workerContext = SearchContext(workers=1)
+    workerContext.sharedAlpha, workerContext.stopFlag = alpha, stop
+    workerContext.stopCheck = lambda: stop.value != 0
+
+
+"""
+Runs in a search worker: searches one root move and returns (packed move, score, SearchStats, worker pid, packed
+principal variation after the move).  The alpha bound is the best root score found when the task starts.  score is None
+if the search was stopped.
+"""
+def searchRootMove(task):
+    global workerSearchId
+    context = workerContext
+    taskSearchId, fen, gameStateClass, packed, depth, taskDeadline = task
+    if workerSearchId != taskSearchId:  # first task of a new search
+        workerSearchId = taskSearchId
+        context.transpositionTable.newSearch()
+        context.moveOrdering.newSearch()
+    context.stats, context.deadline, context.nodeLimit = SearchStats(TIME_SEARCH), taskDeadline, None
+    context.tablebasePieces = Tablebase.largestTable() if USE_TABLEBASES else 0
+    if context.stopFlag.value:
+        return packed, None, context.stats, os.getpid(), ()
+    gs = gameStateClass(fen)
+    context.rootDepth, context.rootPly = depth, 0  # no node of this search is the root
+    turnMultiplier = 1 if gs.whiteToMove else -1
+    alpha = context.sharedAlpha.value
+    gs.makeMove(Move.fromPacked(packed))
+    context.pvTable[1] = ()
+    try:
+        score = -context.findMoveNegaMaxAlphaBeta(gs, None, depth - 1, -CHECKMATE, -alpha, -turnMultiplier)
+    except SearchTimeout:
+        score = None
+    return packed, score, context.stats, os.getpid(), tuple(move.packed for move in context.pvTable[1])
+
+
+"""
+Passes on the moves of a staged generator, adding the time spent generating them to stats.moveGenTime.
+"""
+def timedMoves(moves, stats):
+    moves = iter(moves)
+    while True:
+        start = time.perf_counter()
+        move = next(moves, None)
+        stats.moveGenTime += time.perf_counter() - start
+        if move is None:
+            return
+        yield move
+
+
+"""
+The search score of a tablebase value for the side to move, ply plies from the root: a won or lost ending scores as a
+mate in the plies the table gives, counted from the root like the mates the search finds.
+"""
+def tablebaseScore(value, ply):
+    if value == Tablebase.DRAW:
+        return STALEMATE
+    if value < Tablebase.LOSS:
+        return CHECKMATE - (ply + value)
+    return -(CHECKMATE - (ply + value - Tablebase.LOSS))
+
+
+"""
+Mate scores count plies from the root, but a position can be reached at different plies, so the transposition table
+keeps them counted from the position itself: scoreToTable converts a score at ply for storing, scoreFromTable back.
+"""
+def scoreToTable(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
 
 
 """
@@ -1,4 +1,18 @@
-from Move import Move, CastleRights
+from Move import Move, WKS, WQS, BKS, BQS, ALL_CASTLE_RIGHTS
+from PieceScores import pieceSquareScores
+from Zobrist import pieceKeys, blackToMoveKey, castleKeys, enpassantKeys, computeKey
+from AttackTables import DIRECTIONS, ORTHOGONALS, DIAGONALS, KNIGHT_TARGETS, KING_TARGETS, RAYS, PAWN_ATTACKS, \
+    KNIGHT_SQUARES, KING_SQUARES, PAWN_ATTACK_SQUARES
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+UNDO_STACK_SIZE = 256  # plies the undo stack holds before it has to grow
+SQUARE_COORDS = [(sq & 7, sq >> 3) for sq in range(64)]  # (col, row) of every square, shared so makeMove doesn't build them
+NO_SQUARE = -1  # the en passant square of an undo record when there is none
+
+# castling rights kept when a piece moves from or to a square: a king or rook leaving home, or a rook captured there
+CASTLE_MASKS = [ALL_CASTLE_RIGHTS] * 64
+CASTLE_MASKS[0], CASTLE_MASKS[4], CASTLE_MASKS[7] = ALL_CASTLE_RIGHTS & ~BQS, ALL_CASTLE_RIGHTS & ~(BKS | BQS), ALL_CASTLE_RIGHTS & ~BKS
+CASTLE_MASKS[56], CASTLE_MASKS[60], CASTLE_MASKS[63] = ALL_CASTLE_RIGHTS & ~WQS, ALL_CASTLE_RIGHTS & ~(WKS | WQS), ALL_CASTLE_RIGHTS & ~WKS
 
 """
 This class is responsible for storing all the information about the current
@@ -6,7 +20,7 @@ state of a chess game.  It will also be responsible for determining the valid
 moves at the current state.  It will also keep a move log.
 """
 class GameState:
-    def __init__(self):
+    def __init__(self, fen=None):
         self.board = [
             ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
             ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
@@ -18,7 +32,7 @@ class GameState:
             ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
         ]
 
-        self.moveFunctions = {'p': self.getPawnMoves, 'R': self.getRookMoves, 'N': self.getKnightMoves, 'B': self.getBishopMoves, 'Q': self.getQueenMoves, 'K': self.getKingMoves}
+        self.bindMoveFunctions()
 
         self.whiteKingLocation, self.blackKingLocation = (4, 7), (4, 0)  # (col, row)
 
@@ -27,25 +41,199 @@ class GameState:
         self.moveLog = []
 
         self.pins, self.checks, self.inCheck = [], [], False
+        self.enemyAttacks = bytearray(64)  # squares (row * 8 + col) the side not to move attacks, see getEnemyAttacks
         self.checkMate, self.staleMate = False, False
 
         self.enpassantPossible = ()
-        self.enpassantPossibleLog = [self.enpassantPossible]
+        self.castleRights = ALL_CASTLE_RIGHTS  # bits WKS, WQS, BKS, BQS (Move.py) of the castling rights still available
+        self.halfmoveClock = 0  # plies since the last capture or pawn move
+        self.fullmoveNumber = 1
+
+        self.zobristKey = computeKey(self)  # hash of the position, updated incrementally by makeMove
+        self.boardScore = self.computeBoardScore()  # material + position score, +ve good for white.  Updated by makeMove
+        self.pieceCount = 32  # pieces on the board, kings included.  Updated by makeMove, e.g. to know when to probe tablebases
+        self.undoStack = [[0, NO_SQUARE, 0, 0, 0.0] for ply in range(UNDO_STACK_SIZE)]  # see resetUndoStack
+
+        if fen is not None:
+            self.loadFen(fen)
+        else:
+            self.resetUndoStack()
+
+
+    """
+    Sets up the board, side to move, castling rights, en passant square and move clocks from a FEN string.
+    The move log is cleared.
+    """
+    def loadFen(self, fen):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"FEN needs at least 4 fields: {fen}")
+        ranks = fields[0].split("/")
+        if len(ranks) != 8:
+            raise ValueError(f"FEN board needs 8 ranks: {fen}")
+
+        board = []
+        for rank in ranks:
+            row = []
+            for char in rank:
+                if char.isdigit():
+                    row.extend(["--"] * int(char))
+                elif char.upper() in "PNBRQK":
+                    color = 'w' if char.isupper() else 'b'
+                    piece = 'p' if char.upper() == 'P' else char.upper()
+                    row.append(color + piece)
+                else:
+                    raise ValueError(f"bad FEN piece '{char}': {fen}")
+            if len(row) != 8:
+                raise ValueError(f"FEN rank '{rank}' is not 8 squares: {fen}")
+            board.append(row)
+
+        kingLocations = {}
+        for r in range(8):
+            for c in range(8):
+                if board[r][c][1] == 'K':
+                    if board[r][c] in kingLocations:
+                        raise ValueError(f"FEN has more than one {board[r][c]}: {fen}")
+                    kingLocations[board[r][c]] = (c, r)
+        if "wK" not in kingLocations or "bK" not in kingLocations:
+            raise ValueError(f"FEN needs both kings: {fen}")
+
+        if fields[1] not in ("w", "b"):
+            raise ValueError(f"bad FEN side to move '{fields[1]}': {fen}")
+        if fields[2] != "-" and (not fields[2] or any(char not in "KQkq" for char in fields[2])):
+            raise ValueError(f"bad FEN castling rights '{fields[2]}': {fen}")
+
+        enpassantPossible = ()
+        if fields[3] != "-":
+            square = fields[3]
+            if len(square) != 2 or square[0] not in Move.filesToCols or square[1] not in ("3", "6"):
+                raise ValueError(f"bad FEN en passant square '{square}': {fen}")
+            enpassantPossible = (Move.filesToCols[square[0]], Move.ranksToRows[square[1]])
+
+        self.board = board
+        self.whiteKingLocation, self.blackKingLocation = kingLocations["wK"], kingLocations["bK"]
+        self.whiteToMove = fields[1] == "w"
+        self.moveLog = []
+        self.pins, self.checks, self.inCheck = [], [], False
+        self.checkMate, self.staleMate = False, False
+
+        self.enpassantPossible = enpassantPossible
+        self.castleRights = sum(bit for char, bit in (("K", WKS), ("Q", WQS), ("k", BKS), ("q", BQS)) if char in fields[2])
+        self.halfmoveClock = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmoveNumber = int(fields[5]) if len(fields) > 5 else 1
 
-        self.currentCastlingRights = CastleRights(True, True, True, True)
-        self.castleRightsLog = [CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks, self.currentCastlingRights.wqs, self.currentCastlingRights.bqs)]  # initial log is [(T, T, T, T)]
+        self.zobristKey = computeKey(self)
+        self.boardScore = self.computeBoardScore()
+        self.pieceCount = sum(square != "--" for row in board for square in row)
+        self.resetUndoStack()
+
+    def bindMoveFunctions(self):
+        self.moveFunctions = {'p': self.getPawnMoves, 'R': self.getRookMoves, 'N': self.getKnightMoves, 'B': self.getBishopMoves, 'Q': self.getQueenMoves, 'K': self.getKingMoves}
+
+    """
+    The undo stack: undoStack[ply] records what a move can't be worked back from, for the position after ply moves:
+    [castleRights, en passant square (row * 8 + col, or NO_SQUARE), halfmoveClock, zobristKey, boardScore].  The records
+    are created once by __init__ and their fields overwritten in place by makeMove, so making and taking back moves
+    doesn't build a record per move (the hash and score values themselves are still new Python objects).  The stack is
+    indexed by len(moveLog), so with the move log empty, resetting it only means writing undoStack[0], the position the
+    game starts from.
+    """
+    def resetUndoStack(self):
+        self.undoStack[0][:] = self.castleRights, self.enpassantSquare(), self.halfmoveClock, self.zobristKey, self.boardScore
+
+    """
+    The en passant square as a square index, or NO_SQUARE.
+    """
+    def enpassantSquare(self):
+        if self.enpassantPossible == ():
+            return NO_SQUARE
+        col, row = self.enpassantPossible
+        return row * 8 + col
+
+    """
+    Pickled (e.g. to send to a worker process) without the bound move functions and the unused part of the undo stack,
+    which are rebuilt when it is unpickled.
+    """
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["moveFunctions"]
+        state["undoStack"] = self.undoStack[:len(self.moveLog) + 1]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bindMoveFunctions()
+        self.undoStack += [[0, NO_SQUARE, 0, 0, 0.0] for ply in range(len(self.undoStack), UNDO_STACK_SIZE)]
+
+    """
+    How many times the current position has occurred in the game, this time included.  Positions are compared by their
+    hash, and only back to the last capture or pawn move, before which none can repeat.
+    """
+    def repetitions(self):
+        ply, key = len(self.moveLog), self.zobristKey
+        return sum(1 for earlier in range(max(0, ply - self.halfmoveClock), ply + 1) if self.undoStack[earlier][3] == key)
+
+
+    """
+    Material + position score of the board from scratch.  +ve score is good for white, -ve score is good for black.
+    """
+    def computeBoardScore(self):
+        score = 0
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] != "--":
+                    score += pieceSquareScores[self.board[r][c]][r * 8 + c]
+        return score
+
+
+    """
+    Returns the current position as a FEN string.
+    """
+    def getFen(self):
+        ranks = []
+        for row in self.board:
+            rank, empty = "", 0
+            for square in row:
+                if square == "--":
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                char = 'P' if square[1] == 'p' else square[1]
+                rank += char if square[0] == 'w' else char.lower()
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        castling = "".join(char for char, bit in (("K", WKS), ("Q", WQS), ("k", BKS), ("q", BQS)) if self.castleRights & bit)
+
+        if self.enpassantPossible != ():
+            enpassant = Move.colsToFiles[self.enpassantPossible[0]] + Move.rowsToRanks[self.enpassantPossible[1]]
+        else:
+            enpassant = "-"
+
+        return f"{'/'.join(ranks)} {'w' if self.whiteToMove else 'b'} {castling or '-'} {enpassant} {self.halfmoveClock} {self.fullmoveNumber}"
 
 
     """
     Iterates through all pieces of the board, calculating possible moves for every piece of the color of whose turn it is.
+    captures/quiets choose which moves are generated (promotions count as captures).  fromSquare (col, row) only
+    generates the moves of the piece on that square.
     """
-    def getAllPossibleMoves(self):
+    def getAllPossibleMoves(self, captures=True, quiets=True, fromSquare=None):
         moves = []  # ((startCol, startRow), (endCol, endRow), board)
+        if fromSquare is not None:
+            c, r = fromSquare
+            color, piece = self.board[r][c][0], self.board[r][c][1]
+            if (color == 'w') == self.whiteToMove and piece != '-':
+                self.moveFunctions[piece](r, c, moves, captures, quiets)
+            return moves
         for r in range(len(self.board)):  # number of rows
             for c in range(len(self.board[r])):  # number of cols in given row
                 color, piece = self.board[r][c][0], self.board[r][c][1]
                 if (color =='b' and self.whiteToMove == False) or (color =='w' and self.whiteToMove== True):  # if the piece is black, and it's black's turn, or if piece is white, and it's white's turn:
-                    self.moveFunctions[piece](r, c, moves)  # appends all moves for each pieces to list moves = []
+                    self.moveFunctions[piece](r, c, moves, captures, quiets)  # appends all moves for each pieces to list moves = []
         return moves
 
 
@@ -53,46 +241,141 @@ class GameState:
     All moves considering check
     """
     def getValidMoves(self):
-        moves = []
+        return self.generateMoves(self.prepareMoveGeneration())
+
+    """
+    Works out the checks and pins of the side to move, and in single check the squares a move other than a king move must
+    land on.  Returns them as the prepared state generateMoves needs, so a generator suspended during a search can keep
+    generating from its own position after the search has changed self.pins and self.checks.  The last entry is the
+    enemy attack map, filled in by generateMoves the first time king moves are generated.
+    """
+    def prepareMoveGeneration(self):
         self.inCheck, self.pins, self.checks = self.checkForPinsAndChecks()
+        validSquares = None
+        if self.inCheck and len(self.checks) == 1:  # only 1 check: block check or move king
+            kingCol, kingRow = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+            check = self.checks[0]  # (endCol, endRow, dir-col, dir-row)
+            checkCol = check[0]
+            checkRow = check[1]
+            pieceChecking = self.board[checkRow][checkCol]
+            validSquares = []
+            if pieceChecking[1] == 'N':  # if knight, must capture knight or move king
+                validSquares = [(checkCol, checkRow)]
+            else:  # else block the check
+                for i in range(1, 8):
+                    validSquare = (kingCol + check[2] * i, kingRow + check[3] * i)  # check[2] == dir-col, check[3] == dir-row
+                    validSquares.append(validSquare)
+                    if validSquare[0] == checkCol and validSquare[1] == checkRow:  # go upto the check square
+                        break
+        return [self.inCheck, self.pins, self.checks, validSquares, None]
 
+    """
+    Legal moves from a prepared state (see prepareMoveGeneration).  captures/quiets and fromSquare as getAllPossibleMoves.
+    """
+    def generateMoves(self, prepared, captures=True, quiets=True, fromSquare=None):
+        self.inCheck, self.pins, self.checks, validSquares, self.enemyAttacks = prepared
         if self.whiteToMove:
             kingCol, kingRow = self.whiteKingLocation[0], self.whiteKingLocation[1]
         else:
             kingCol, kingRow = self.blackKingLocation[0], self.blackKingLocation[1]
+        if self.enemyAttacks is None and (fromSquare is None or fromSquare == (kingCol, kingRow)):
+            self.enemyAttacks = prepared[4] = self.getEnemyAttacks()  # once per position, for king moves and castling
         if self.inCheck:
             if len(self.checks) == 1:  # only 1 check: block check or move king
-                moves = self.getAllPossibleMoves()
-                check = self.checks[0]  # (endCol, endRow, dir-col, dir-row)
-                checkCol = check[0]
-                checkRow = check[1]
-                pieceChecking = self.board[checkRow][checkCol]
-                validSquares = []
-                if pieceChecking[1] == 'N':  # if knight, must capture knight or move king
-                    validSquares = [(checkCol, checkRow)]
-                else:  # else block the check
-                    for i in range(1, 8):
-                        validSquare = (kingCol + check[2] * i, kingRow + check[3] * i)  # check[2] == dir-col, check[3] == dir-row
-                        validSquares.append(validSquare)
-                        if validSquare[0] == checkCol and validSquare[1] == checkRow:  # go upto the check square
-                            break
+                moves = self.getAllPossibleMoves(captures, quiets, fromSquare)
+                checkCol, checkRow = self.checks[0][0], self.checks[0][1]
                 # get rid of any moves that don't block check or more king
                 for i in range(len(moves)-1, -1, -1):  # go through backwards when removing from a list
                     if moves[i].pieceMoved[1] != 'K':  # move doesn't move king, so must block or capture
+                        if moves[i].isEnpassantMove and (moves[i].endCol, moves[i].startRow) == (checkCol, checkRow):
+                            continue  # en passant capturing the checking pawn
                         if not (moves[i].endCol, moves[i].endRow) in validSquares:
                             moves.remove(moves[i])
             else:  # double check, king has to move
-                self.getKingMoves(kingRow, kingCol, moves)
+                moves = []
+                if fromSquare is None or fromSquare == (kingCol, kingRow):
+                    self.getKingMoves(kingRow, kingCol, moves, captures, quiets)
         else:  # not in check so all moves are fine
-            moves = self.getAllPossibleMoves()
+            moves = self.getAllPossibleMoves(captures, quiets, fromSquare)
 
         # to generate castle moves
-        if self.whiteToMove:
-            self.getCastleMoves(7,4, moves)  # can only castle if the king hasn't moved.
-        else:
-            self.getCastleMoves(0, 4, moves)
+        if quiets and (fromSquare is None or fromSquare == (kingCol, kingRow)):
+            if self.whiteToMove:
+                self.getCastleMoves(7,4, moves)  # can only castle if the king hasn't moved.
+            else:
+                self.getCastleMoves(0, 4, moves)
         return moves
 
+    """
+    Yields the legal moves in stages: the hash move (a packed move from the transposition table, if it is legal here), then
+    captures and promotions, then quiet moves.  Each stage is only generated when the one before it is used up, so a
+    search that gets a beta cutoff early never generates the quiet moves.  captureKey/quietKey optionally sort a stage
+    (highest first).  The position must be the same each time the generator is resumed.
+    """
+    def getStagedMoves(self, hashMove=None, captureKey=None, quietKey=None):
+        prepared = self.prepareMoveGeneration()
+        if hashMove is not None:
+            startSq = hashMove & 63
+            for move in self.generateMoves(prepared, fromSquare=(startSq & 7, startSq >> 3)):
+                if move.packed == hashMove:
+                    yield move
+                    break
+            else:
+                hashMove = None
+
+        captures = self.generateMoves(prepared, True, False)
+        if captureKey is not None:
+            captures.sort(key=captureKey, reverse=True)
+        for move in captures:
+            if move.packed != hashMove:
+                yield move
+
+        quietMoves = self.generateMoves(prepared, False, True)
+        if quietKey is not None:
+            quietMoves.sort(key=quietKey, reverse=True)
+        for move in quietMoves:
+            if move.packed != hashMove:
+                yield move
+
+
+    """
+    Every square the side not to move attacks, as a bytearray indexed by row * 8 + col.  Sliding attacks go through our
+    king (x-ray), so the king can't step back along the line of a check.  Worked out once per position for king moves
+    and castling.
+    """
+    def getEnemyAttacks(self):
+        attacked = bytearray(64)
+        if self.whiteToMove:
+            enemyColor, allyKing = 'b', 'wK'
+        else:
+            enemyColor, allyKing = 'w', 'bK'
+        board = self.board
+        pawnAttacks = PAWN_ATTACK_SQUARES[enemyColor]
+        sq = -1
+        for row in board:
+            for piece in row:
+                sq += 1
+                if piece[0] != enemyColor:
+                    continue
+                kind = piece[1]
+                if kind == 'p':
+                    targets = pawnAttacks[sq]
+                elif kind == 'N':
+                    targets = KNIGHT_SQUARES[sq]
+                elif kind == 'K':
+                    targets = KING_SQUARES[sq]
+                else:
+                    rays = RAYS[sq]
+                    for j in (ORTHOGONALS if kind == 'R' else DIAGONALS if kind == 'B' else range(8)):
+                        for endCol, endRow in rays[j]:
+                            attacked[endRow * 8 + endCol] = 1
+                            endPiece = board[endRow][endCol]
+                            if endPiece != '--' and endPiece != allyKing:
+                                break
+                    continue
+                for target in targets:
+                    attacked[target] = 1
+        return attacked
 
     """
     Returns if the player is in check, a list of pins, and a list of checks
@@ -107,56 +390,50 @@ class GameState:
         else:
             enemyColor, allyColor = "w", "b"
             startCol, startRow = self.blackKingLocation[0], self.blackKingLocation[1]
+        board = self.board
+        rays = RAYS[startRow * 8 + startCol]
+        pawnDirections = (6, 7) if enemyColor == 'w' else (4, 5)  # white pawns attack up the board, so sit below the king
         # check outward from king for pins and checks, keep track of pins.  Pin direction is OUTWARD from the KING
-        directions = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1))  # (col, row): l, r, u, d, lu, ru, ld, rd
-        for j in range(len(directions)):
-            d = directions[j]  # (1, 1)
+        for j in range(8):
             possiblePin = ()  # reset possible pin for said direction
-            for i in range(1, 8):  # up until the end of the board
-                endCol = startCol + d[0] * i
-                endRow = startRow + d[1] * i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:
-                    endPiece = self.board[endRow][endCol]
-                    # check for pins
-                    if endPiece[0] == allyColor and endPiece[1] != 'K':
-                        if possiblePin == ():  # 1st allied piece could be pinned
-                            possiblePin = (endCol, endRow, d[0], d[1])
-                        else:  # 2nd allied piece, so no pin or check possible in this direction.
+            i = 0
+            for endCol, endRow in rays[j]:  # up until the end of the board
+                i += 1
+                endPiece = board[endRow][endCol]
+                # check for pins
+                if endPiece[0] == allyColor and endPiece[1] != 'K':
+                    if possiblePin == ():  # 1st allied piece could be pinned
+                        possiblePin = (endCol, endRow) + DIRECTIONS[j]
+                    else:  # 2nd allied piece, so no pin or check possible in this direction.
+                        break
+                # check for checks
+                elif endPiece[0] == enemyColor:
+                    piece = endPiece[1]
+                    # orthogonally from king & piece == rook
+                    # diagonally & piece == bishop
+                    # 1 square away & piece == pawn
+                    # any direction & piece == queen
+                    # any direction 1 square away & piece == king
+                    if (j <= 3 and piece == 'R') or \
+                            (j >= 4 and piece == 'B') or \
+                            (i == 1 and piece == 'p' and j in pawnDirections) or \
+                            (piece == 'Q') or \
+                            (i == 1 and piece == 'K'):
+                        if possiblePin == ():  # if enemyPiece in range and no pin, inCheck = True.
+                            inCheck = True
+                            checks.append((endCol, endRow) + DIRECTIONS[j])
                             break
-                    # check for checks
-                    elif endPiece[0] == enemyColor:
-                        piece = endPiece[1]
-                        # orthogonally from king & piece == rook
-                        # diagonally & piece == bishop
-                        # 1 square away & piece == pawn
-                        # any direction & piece == queen
-                        # any direction 1 square away & piece == king
-                        if (0 <= j <= 3 and piece == 'R') or \
-                                (4 <= j <= 7 and piece == 'B') or \
-                                (i == 1 and piece == 'p' and ( (enemyColor == 'w' and 6 <= j <= 7) or (enemyColor == 'b' and 4 <= j <= 5 ) )) or \
-                                (piece == 'Q') or \
-                                (i == 1 and piece == 'K'):
-                            if possiblePin == ():  # if enemyPiece in range and no pin, inCheck = True.
-                                inCheck = True
-                                checks.append((endCol, endRow, d[0], d[1]))
-                                break
-                            else:  # allied piece blocking so pin
-                                pins.append(possiblePin)
-                                break
-                        else:  # enemy piece not applying check
+                        else:  # allied piece blocking so pin
+                            pins.append(possiblePin)
                             break
-                else:  # off board
-                    break
+                    else:  # enemy piece not applying check
+                        break
         # knight checks
-        knightMoves = ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2))
-        for m in knightMoves:
-            endCol = startCol + m[0]
-            endRow = startRow + m[1]
-            if 0 <= endCol < 8 and 0 <= endRow < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] == enemyColor and endPiece[1] == 'N':  # enemy knight attacking king
-                    inCheck = True
-                    checks.append((endCol, endRow, m[0], m[1]))
+        enemyKnight = enemyColor + 'N'
+        for endCol, endRow in KNIGHT_TARGETS[startRow * 8 + startCol]:
+            if board[endRow][endCol] == enemyKnight:  # enemy knight attacking king
+                inCheck = True
+                checks.append((endCol, endRow, endCol - startCol, endRow - startRow))
 
         return inCheck, pins, checks
 
@@ -168,11 +445,13 @@ class GameState:
             move = self.moveLog.pop()
             self.board[move.startRow][move.startCol] = move.pieceMoved
             self.board[move.endRow][move.endCol] = move.pieceCaptured
+            if move.pieceCaptured != "--":
+                self.pieceCount += 1
             #update king's location
             if move.pieceMoved == 'wK':
-                self.whiteKingLocation = (move.startCol, move.startRow)
+                self.whiteKingLocation = SQUARE_COORDS[move.startRow * 8 + move.startCol]
             elif move.pieceMoved == 'bK':
-                self.blackKingLocation = (move.startCol, move.startRow)
+                self.blackKingLocation = SQUARE_COORDS[move.startRow * 8 + move.startCol]
 
             self.whiteToMove = not self.whiteToMove #swap players back
 
@@ -180,10 +459,6 @@ class GameState:
             if move.isEnpassantMove:
                 self.board[move.endRow][move.endCol] = '--' # leave landing sq blank
                 self.board[move.startRow][move.endCol] = move.pieceCaptured
-                self.enpassantPossible = (move.endCol, move.endRow)
-            # undo a 2 sq pawn advance
-            if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
-                self.enpassantPossible = ()
 
             # move rook back if a castle move
             if move.isCastleMove:
@@ -195,13 +470,11 @@ class GameState:
                     self.board[move.endRow][move.endCol -2] = self.board[move.endRow][move.endCol + 1]
                     self.board[move.endRow][move.endCol + 1] = "--"
 
-            # undo castling rights
-            self.castleRightsLog.pop() # get rid of castle rights from move we are undoing.
-            lastCastleRights = self.castleRightsLog[-1]
-            self.currentCastlingRights = CastleRights(lastCastleRights.wks, lastCastleRights.bks, lastCastleRights.wqs, lastCastleRights.bqs)  # reinitialize castle rights to not make a copy
-
-            self.enpassantPossibleLog.pop()
-            self.enpassantPossible = self.enpassantPossibleLog[-1]
+            # castling rights, en passant square, clock, hash and score from before the move
+            self.castleRights, enpassantSquare, self.halfmoveClock, self.zobristKey, self.boardScore = self.undoStack[len(self.moveLog)]
+            self.enpassantPossible = () if enpassantSquare == NO_SQUARE else SQUARE_COORDS[enpassantSquare]
+            if not self.whiteToMove:
+                self.fullmoveNumber -= 1
 
             self.checkMate = False
             self.staleMate = False
@@ -210,15 +483,27 @@ class GameState:
     Takes a Move as a parameter and executes it.  After making move, changes White to move parameter
     """
     def makeMove(self, move):
+        startSq, endSq = move.startRow * 8 + move.startCol, move.endRow * 8 + move.endCol
+        # take the moving piece, any captured piece, the old castling rights and en passant file out of the hash
+        key = self.zobristKey ^ castleKeys[self.castleRights] ^ pieceKeys[move.pieceMoved][startSq]
+        if self.enpassantPossible != ():
+            key ^= enpassantKeys[self.enpassantPossible[0]]
+        score = self.boardScore - pieceSquareScores[move.pieceMoved][startSq]
+        if move.pieceCaptured != "--":
+            captureRow = move.startRow if move.isEnpassantMove else move.endRow
+            key ^= pieceKeys[move.pieceCaptured][captureRow * 8 + move.endCol]
+            score -= pieceSquareScores[move.pieceCaptured][captureRow * 8 + move.endCol]
+            self.pieceCount -= 1
+
         self.board[move.startRow][move.startCol] = "--"
         self.board[move.endRow][move.endCol] = move.pieceMoved
         self.moveLog.append(move)  # log the move to undo later.
 
         # update the king's location
         if move.pieceMoved == 'wK':
-            self.whiteKingLocation = (move.endCol, move.endRow)
+            self.whiteKingLocation = SQUARE_COORDS[endSq]
         elif move.pieceMoved == 'bK':
-            self.blackKingLocation = (move.endCol, move.endRow)
+            self.blackKingLocation = SQUARE_COORDS[endSq]
 
         # pawn promotion
         if move.isPawnPromotion:
@@ -226,8 +511,10 @@ class GameState:
 
         # enpassant
         if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:  # if a pawn moves 2 squares
-            self.enpassantPossible = (move.startCol, (move.startRow + move.endRow) // 2)  # enpassant possible to the square where the pawn would have moved if it had only moved 1 square.
+            enpassantSquare = (startSq + endSq) // 2  # enpassant possible to the square where the pawn would have moved if it had only moved 1 square.
+            self.enpassantPossible = SQUARE_COORDS[enpassantSquare]
         else:
+            enpassantSquare = NO_SQUARE
             self.enpassantPossible = ()
         if move.isEnpassantMove:
             self.board[move.startRow][move.endCol] = "--"  # capturing the pawn
@@ -237,54 +524,96 @@ class GameState:
             if move.endCol - move.startCol == 2:  # to the right: king side castle
                 self.board[move.endRow][move.endCol - 1] = self.board[move.endRow][move.endCol + 1]  # copy the rook to the new square
                 self.board[move.endRow][move.endCol + 1] = "--"  # remove the old rook
+                rookKeys = pieceKeys[self.board[move.endRow][move.endCol - 1]]
+                key ^= rookKeys[endSq + 1] ^ rookKeys[endSq - 1]
+                rookScores = pieceSquareScores[self.board[move.endRow][move.endCol - 1]]
+                score += rookScores[endSq - 1] - rookScores[endSq + 1]
 
             elif move.endCol - move.startCol == -2:  # to the left: queen side castle
                 self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 2]
                 self.board[move.endRow][move.endCol - 2] = "--"
+                rookKeys = pieceKeys[self.board[move.endRow][move.endCol + 1]]
+                key ^= rookKeys[endSq - 2] ^ rookKeys[endSq + 1]
+                rookScores = pieceSquareScores[self.board[move.endRow][move.endCol + 1]]
+                score += rookScores[endSq + 1] - rookScores[endSq - 2]
 
-        self.updateCastleRights(move)  # update the castling rights whenever it's a rook or a king move
-        self.castleRightsLog.append(CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks, self.currentCastlingRights.wqs, self.currentCastlingRights.bqs))
+        # a king or rook moving from its home square, or a rook captured on it, loses those castling rights
+        self.castleRights &= CASTLE_MASKS[startSq] & CASTLE_MASKS[endSq]
 
-        self.enpassantPossibleLog.append(self.enpassantPossible)
+        # 50 move rule clock and move number
+        if move.pieceMoved[1] == 'p' or move.pieceCaptured != "--":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if not self.whiteToMove:
+            self.fullmoveNumber += 1
+
+        # put the piece on its end square (a queen if promoted), the new castling rights and en passant file into the hash
+        key ^= pieceKeys[self.board[move.endRow][move.endCol]][endSq] ^ castleKeys[self.castleRights] ^ blackToMoveKey
+        if self.enpassantPossible != ():
+            key ^= enpassantKeys[self.enpassantPossible[0]]
+        self.zobristKey = key
+        self.boardScore = score + pieceSquareScores[self.board[move.endRow][move.endCol]][endSq]
+        self.pushUndoRecord(enpassantSquare)
 
         self.whiteToMove = not self.whiteToMove  # swap players of the gameState
 
     """
-    Update the castle rights given a move
-    """
-    def updateCastleRights(self, move):
-        # check if the king moved or the rock moved
-        if move.pieceMoved == "wK":
-            self.currentCastlingRights.wks = False
-            self.currentCastlingRights.wqs = False
-        elif move.pieceMoved == "bK":
-            self.currentCastlingRights.bks = False
-            self.currentCastlingRights.bqs = False
-        elif move.pieceMoved == "wR":
-            if move.startRow == 7:
-                if move.startCol == 0:  # whites left rock
-                    self.currentCastlingRights.wqs = False
-                if move.startCol == 7:  # whites right rock
-                    self.currentCastlingRights.wks = False
-        elif move.pieceMoved == "bR":
-            if move.startRow == 0:
-                if move.startCol == 0:  # black left rock
-                    self.currentCastlingRights.bqs = False
-                if move.startCol == 7:  # black right rock
-                    self.currentCastlingRights.bks = False
-        # check if the rock is captured
-        if move.pieceCaptured == "wR":
-            if move.endRow == 7:
-                if move.endCol == 0:
-                    self.currentCastlingRights.wqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRights.wks = False
-        elif move.pieceCaptured == "bR":
-            if move.endRow == 0:
-                if move.endCol == 0:
-                    self.currentCastlingRights.bqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRights.bks = False
+    Writes the state after the move just logged into its record on the undo stack, growing the stack if the game has
+    outrun it.  enpassantSquare is the en passant square as an index, which makeMove already has.
+    """
+    def pushUndoRecord(self, enpassantSquare):
+        ply = len(self.moveLog)
+        if ply == len(self.undoStack):
+            self.undoStack += [[0, NO_SQUARE, 0, 0, 0.0] for i in range(ply)]
+        record = self.undoStack[ply]
+        record[0] = self.castleRights
+        record[1] = enpassantSquare
+        record[2] = self.halfmoveClock
+        record[3] = self.zobristKey
+        record[4] = self.boardScore
+
+    """
+    Passes the turn to the other side without moving a piece, for null move pruning in the search.  The en passant square
+    is cleared and the hash updated.  None is logged as the move so len(moveLog) still counts the plies and indexes the
+    undo stack; undoNullMove takes it back.
+    """
+    def makeNullMove(self):
+        if self.enpassantPossible != ():
+            self.zobristKey ^= enpassantKeys[self.enpassantPossible[0]]
+            self.enpassantPossible = ()
+        self.zobristKey ^= blackToMoveKey
+        self.halfmoveClock += 1
+        if not self.whiteToMove:
+            self.fullmoveNumber += 1
+        self.moveLog.append(None)
+        self.pushUndoRecord(NO_SQUARE)
+        self.whiteToMove = not self.whiteToMove
+
+    def undoNullMove(self):
+        self.moveLog.pop()
+        self.whiteToMove = not self.whiteToMove
+        if not self.whiteToMove:
+            self.fullmoveNumber -= 1
+        self.castleRights, enpassantSquare, self.halfmoveClock, self.zobristKey, self.boardScore = self.undoStack[len(self.moveLog)]
+        self.enpassantPossible = () if enpassantSquare == NO_SQUARE else SQUARE_COORDS[enpassantSquare]
+        self.checkMate = False
+        self.staleMate = False
+
+    """
+    True if the side to move's king is attacked.  Unlike inCheck this doesn't need the moves to have been generated.
+    """
+    def kingInCheck(self):
+        col, row = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        return self.squareUnderAttack(row, col)
+
+    """
+    True if the side to move has a piece other than pawns and the king.  Without one, zugzwang is common and passing is
+    not a safe guess at the worst it can do.
+    """
+    def hasNonPawnMaterial(self):
+        color = 'w' if self.whiteToMove else 'b'
+        return any(square[0] == color and square[1] in "NBRQ" for row in self.board for square in row)
 
 
     """
@@ -297,20 +626,20 @@ class GameState:
                 not (self.board[r][c + 1] == "--" and self.board[r][c + 2] == "--"):
             return  # if queenside and kingside blocked, return.
 
-        if self.squareUnderAttack(r, c): return  # check if the king is inCheck as the king can't escape the check by castling
-        if (self.whiteToMove and self.currentCastlingRights.wks) or (not self.whiteToMove and self.currentCastlingRights.bks):  # kingside
+        if self.inCheck: return  # the king can't escape the check by castling
+        if self.castleRights & (WKS if self.whiteToMove else BKS):  # kingside
             self.getKingSideCastleMoves(r, c, moves)
-        if (self.whiteToMove and self.currentCastlingRights.wqs) or (not self.whiteToMove and self.currentCastlingRights.bqs):  # queenside
+        if self.castleRights & (WQS if self.whiteToMove else BQS):  # queenside
             self.getQueenSideCastleMoves(r, c, moves)
 
     def getKingSideCastleMoves(self, r, c, moves):
         if self.board[r][c + 1] == "--" and self.board[r][c + 2] == "--":
-            if not self.squareUnderAttack(r, c + 1) and not self.squareUnderAttack(r, c + 2):
+            if not self.enemyAttacks[r * 8 + c + 1] and not self.enemyAttacks[r * 8 + c + 2]:
                 moves.append(Move((c, r), (c+2, r), self.board, isCastleMove=True))
 
     def getQueenSideCastleMoves(self, r, c, moves):
         if self.board[r][c - 1] == "--" and self.board[r][c - 2] == "--" and self.board[r][c - 3] == "--":
-            if not self.squareUnderAttack(r, c - 1) and not self.squareUnderAttack(r, c - 2):  # only squares king moves through need to not be under attack.
+            if not self.enemyAttacks[r * 8 + c - 1] and not self.enemyAttacks[r * 8 + c - 2]:  # only squares king moves through need to not be under attack.
                 moves.append(Move((c, r), (c-2, r), self.board, isCastleMove=True))
 
 
@@ -318,212 +647,187 @@ class GameState:
     Determine if the enemy can attack the square r, c.  Returns True, False
     """
     def squareUnderAttack(self, r, c):
-
-        enemyColor = 'b' if self.whiteToMove else 'w'
-
-        # check for knights
-        knightMoves = ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2))
-        for m in knightMoves:
-            nr, nc = r + m[0], c + m[1]
-            if 0 <= nr <= 7 and 0 <= nc <= 7:
-                if self.board[nr][nc] == enemyColor + 'N':
-                    return True
-
-        # check for other pieces
-        directions = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1))  # (col, row): l, r, u, d, lu, ru, ld, rd
-        for j in range(len(directions)):
-            d = directions[j]  # (1, 1)
-            for i in range(1, 8):  # up until the end of the board
-                endCol = c + d[0] * i
-                endRow = r + d[1] * i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece[0] == enemyColor:
-                        piece = endPiece[1]
-                        # orthogonally  && piece == rook
-                        # diagonally && piece == bishop
-                        # 1 square away && piece == pawn
-                        # any direction & piece == queen
-                        # any direction 1 square away & piece == king
-                        if (0 <= j <= 3 and piece == 'R') or \
-                                (4 <= j <= 7 and piece == 'B') or \
-                                (i == 1 and piece == 'p' and ( (enemyColor == 'w' and 6 <= j <= 7) or (enemyColor == 'b' and 4 <= j <= 5 ) )) or \
-                                (piece == 'Q') or \
-                                (i == 1 and piece == 'K'):
-                            return True
-                        else:  # if enemy piece detected, but cannot attack, then it is blocking.
-                            break
-                    elif endPiece != '--':  # if friendly piece, then also blocking this direction.
-                        break
+        if self.whiteToMove:
+            allyColor, enemyColor = 'w', 'b'
+        else:
+            allyColor, enemyColor = 'b', 'w'
+        board = self.board
+        sq = r * 8 + c
+
+        # check for knights, pawns and the king
+        enemyPiece = enemyColor + 'N'
+        for endCol, endRow in KNIGHT_TARGETS[sq]:
+            if board[endRow][endCol] == enemyPiece:
+                return True
+        enemyPiece = enemyColor + 'p'
+        for endCol, endRow in PAWN_ATTACKS[allyColor][sq]:  # an enemy pawn attacks us from where our pawn would attack it
+            if board[endRow][endCol] == enemyPiece:
+                return True
+        enemyPiece = enemyColor + 'K'
+        for endCol, endRow in KING_TARGETS[sq]:
+            if board[endRow][endCol] == enemyPiece:
+                return True
+
+        # check for sliding pieces: the first piece along each ray is the only one that can attack
+        rays = RAYS[sq]
+        rook, bishop, queen = enemyColor + 'R', enemyColor + 'B', enemyColor + 'Q'
+        for j in ORTHOGONALS:
+            for endCol, endRow in rays[j]:
+                endPiece = board[endRow][endCol]
+                if endPiece != '--':
+                    if endPiece == rook or endPiece == queen:
+                        return True
+                    break
+        for j in DIAGONALS:
+            for endCol, endRow in rays[j]:
+                endPiece = board[endRow][endCol]
+                if endPiece != '--':
+                    if endPiece == bishop or endPiece == queen:
+                        return True
+                    break
         return False
 
 
     """
-    Get all pawn moves for the pawn located at row, col and add these moves to the list
+    Get all pawn moves for the pawn located at row, col and add these moves to the list.  Pushes to the last rank are
+    promotions and so are generated with the captures.
     """
-    def getPawnMoves(self, r, c, moves):
+    def getPawnMoves(self, r, c, moves, captures=True, quiets=True):
         piecePinned = False
         pinDirection = ()
         for i in range(len(self.pins)-1, -1, -1):
             if self.pins[i][0] == c and self.pins[i][1] == r:  # pins = (endCol, endRow, d[0], d[1])
                 piecePinned = True
                 pinDirection = (self.pins[i][2], self.pins[i][3])
-                self.pins.remove(self.pins[i])
                 break
         if self.whiteToMove:  # white pawn moves
-            if self.board[r - 1][c] == "--":  # moving forwards
-                if not piecePinned or pinDirection == (0, -1):
+            if self.board[r - 1][c] == "--" and (captures if r == 1 else quiets):  # moving forwards
+                if not piecePinned or pinDirection in ((0, -1), (0, 1)):
                     moves.append(Move((c, r),(c, r-1), self.board))
                     if r == 6 and self.board[r - 2][c] == "--":  # move 2 squares forward
                         moves.append(Move((c, r),(c, r-2), self.board))
+            if not captures:
+                return
             if c - 1 >= 0:  # capturing left (ensures not off board)
                 if self.board[r - 1][c - 1][0] =='b':
-                    if not piecePinned or pinDirection == (-1, -1):
+                    if not piecePinned or pinDirection in ((-1, -1), (1, 1)):
                         moves.append(Move((c, r),(c-1, r-1), self.board))
                 elif (c-1, r-1) == self.enpassantPossible and self.board[r][c-1][0] == 'b':
-                    moves.append(Move((c, r), (c-1, r-1), self.board, isEnpassantMove=True))
-                    if not piecePinned or pinDirection == (-1, -1):
+                    if (not piecePinned or pinDirection in ((-1, -1), (1, 1))) and self.enpassantIsLegal(r, c, c-1, r-1):
                         moves.append(Move((c, r), (c-1, r-1), self.board, isEnpassantMove=True))
             if c + 1 <= 7:  # capturing right
                 if self.board[r - 1][c + 1][0] =='b':
-                    if not piecePinned or pinDirection == (1, -1):
+                    if not piecePinned or pinDirection in ((1, -1), (-1, 1)):
                         moves.append(Move((c, r),(c+1, r-1), self.board))
                 elif (c+1, r-1) == self.enpassantPossible and self.board[r][c+1][0] == 'b':
-                    moves.append(Move((c, r), (c+1, r-1), self.board, isEnpassantMove=True))
-                    if not piecePinned or pinDirection == (1, -1):
+                    if (not piecePinned or pinDirection in ((1, -1), (-1, 1))) and self.enpassantIsLegal(r, c, c+1, r-1):
                         moves.append(Move((c, r), (c+1, r-1), self.board, isEnpassantMove=True))
 
         else:  # black pawn moves
-            if self.board[r + 1][c] == "--":  # moving forwards
-                if not piecePinned or pinDirection == (0, 1):
+            if self.board[r + 1][c] == "--" and (captures if r == 6 else quiets):  # moving forwards
+                if not piecePinned or pinDirection in ((0, 1), (0, -1)):
                     moves.append(Move((c, r), (c, r+1), self.board))
                     if r == 1 and self.board[r+2][c] == "--":  # move 2 squares forward
                         moves.append(Move((c, r), (c, r+2), self.board))
+            if not captures:
+                return
             if c - 1 >= 0:  # capturing left
                 if self.board[r + 1][c - 1][0] =='w':
-                    if not piecePinned or pinDirection == (-1, 1):
+                    if not piecePinned or pinDirection in ((-1, 1), (1, -1)):
                         moves.append(Move((c, r),(c-1, r+1), self.board))
                 elif (c-1, r+1) == self.enpassantPossible and self.board[r][c-1][0] == 'w':
-                    if not piecePinned or pinDirection == (-1, 1):
+                    if (not piecePinned or pinDirection in ((-1, 1), (1, -1))) and self.enpassantIsLegal(r, c, c-1, r+1):
                         moves.append(Move((c, r), (c-1, r+1), self.board, isEnpassantMove=True))
             if c + 1 <= 7:  # capturing right
                 if self.board[r + 1][c + 1][0] =='w':
-                    if not piecePinned or pinDirection == (1, 1):
+                    if not piecePinned or pinDirection in ((1, 1), (-1, -1)):
                         moves.append(Move((c, r),(c+1, r+1), self.board))
                 elif (c+1, r+1) == self.enpassantPossible and self.board[r][c+1][0] == 'w':
-                    if not piecePinned or pinDirection == (1, 1):
+                    if (not piecePinned or pinDirection in ((1, 1), (-1, -1))) and self.enpassantIsLegal(r, c, c+1, r+1):
                         moves.append(Move((c, r), (c+1, r+1), self.board, isEnpassantMove=True))
 
+    """
+    An en passant capture removes two pawns from the same row, which the pin detection cannot see.  Make the capture on
+    the board and check the king is not left attacked (e.g. by a rook along the row).
+    """
+    def enpassantIsLegal(self, r, c, endCol, endRow):
+        kingCol, kingRow = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        pawn, capturedPawn = self.board[r][c], self.board[r][endCol]
+        self.board[r][c], self.board[r][endCol], self.board[endRow][endCol] = "--", "--", pawn
+        legal = not self.squareUnderAttack(kingRow, kingCol)
+        self.board[r][c], self.board[r][endCol], self.board[endRow][endCol] = pawn, capturedPawn, "--"
+        return legal
+
     """
     Get all Rook moves for the Rook located at row, col and add these moves to the list
     """
-    def getRookMoves(self, r, c, moves):
-        piecePinned, pinDirection = False, ()  # set  initial variables
-        for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == c and self.pins[i][1] == r:  # (endCol, endRow, d[0], d[1]).
-                piecePinned = True
-                pinDirection = (self.pins[i][2], self.pins[i][3])  # dir[col], dir[row]
-                if self.board[r][c][1] != 'Q': # pinned piece = rook and not a queen
-                    self.pins.remove(self.pins[i])
-                break
-        enemyColor = 'b' if self.whiteToMove == True else 'w'
-        directions = ((-1, 0), (1, 0), (0, -1), (0, 1))  # left, right, up, down
-        for d in directions:
-            for i in range(1, 8):
-                endCol = c + d[0] * i
-                endRow = r + d[1] * i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:  # confine the potential moves to the board
-                    if not piecePinned or pinDirection == d or pinDirection == (-d[0], -d[1]):
-                        endPiece = self.board[endRow][endCol]
-                        if endPiece == '--':  # if blank, append move
-                            moves.append(Move((c, r), (endCol, endRow), self.board))
-                        elif endPiece[0] == enemyColor:  # hits enemy piece, append then break
-                            moves.append(Move((c, r), (endCol, endRow), self.board))
-                            break
-                        else:  # hits own color piece
-                            break
-                else:  # off board
-                    break
+    def getRookMoves(self, r, c, moves, captures=True, quiets=True):
+        self.getSlidingMoves(r, c, moves, ORTHOGONALS, captures, quiets)
 
     """
     Get all Bishop moves for the Bishop located at row, col and add these moves to the list
     """
-    def getBishopMoves(self, r, c, moves):
-        piecePinned, pinDirection = False, ()
+    def getBishopMoves(self, r, c, moves, captures=True, quiets=True):
+        self.getSlidingMoves(r, c, moves, DIAGONALS, captures, quiets)
+
+    """
+    Get all Queen moves for the Queen located at row, col and add these moves to the list
+    """
+    def getQueenMoves(self, r, c, moves, captures=True, quiets=True):
+        self.getSlidingMoves(r, c, moves, range(8), captures, quiets)
+
+    """
+    Moves of a rook, bishop or queen on row, col sliding in the given (col, row) directions.  A pinned piece may only
+    slide along its pin.
+    """
+    def getSlidingMoves(self, r, c, moves, directions, captures, quiets):
+        piecePinned, pinDirection = False, ()  # set  initial variables
         for i in range(len(self.pins)-1, -1, -1):
-            if self.pins[i][0] == c and self.pins[i][1] == r:
+            if self.pins[i][0] == c and self.pins[i][1] == r:  # (endCol, endRow, d[0], d[1]).
                 piecePinned = True
-                pinDirection = (self.pins[i][2], self.pins[i][3])
-                if self.board[r][c][1] != 'Q':  # pinned piece = bishop and not a queen
-                    self.pins.remove(self.pins[i])
+                pinDirection = (self.pins[i][2], self.pins[i][3])  # dir[col], dir[row]
                 break
         enemyColor = 'b' if self.whiteToMove == True else 'w'
-        directions = ((-1, -1), (1, -1), (-1, 1), (1, 1))  # leftup, rightup, leftdown, rightdown
-        for d in directions:
-            for i in range(1, 8):
-                endCol = c + d[0] * i
-                endRow = r + d[1] * i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:  # confine the potential moves to the board
-                    if not piecePinned or pinDirection == d or pinDirection == (-d[0], -d[1]):
-                        endPiece = self.board[endRow][endCol]
-                        if endPiece == '--':  # if blank, append move
-                            moves.append(Move((c, r), (endCol, endRow), self.board))
-                        elif endPiece[0] == enemyColor:  # hits enemy piece, append then break
-                            moves.append(Move((c, r), (endCol, endRow), self.board))
-                            break
-                        else:  # hits own color piece
-                            break
-                else:  # off board
+        board = self.board
+        rays = RAYS[r * 8 + c]
+        for j in directions:
+            d = DIRECTIONS[j]
+            if piecePinned and pinDirection != d and pinDirection != (-d[0], -d[1]):
+                continue
+            for endCol, endRow in rays[j]:
+                endPiece = board[endRow][endCol]
+                if endPiece == '--':  # if blank, append move
+                    if quiets:
+                        moves.append(Move((c, r), (endCol, endRow), board))
+                elif endPiece[0] == enemyColor:  # hits enemy piece, append then break
+                    if captures:
+                        moves.append(Move((c, r), (endCol, endRow), board))
+                    break
+                else:  # hits own color piece
                     break
-
-    """
-    Get all Queen moves for the Queen located at row, col and add these moves to the list
-    """
-    def getQueenMoves(self, r, c, moves):
-        self.getBishopMoves(r, c, moves)
-        self.getRookMoves(r, c, moves)
 
     """
     Get all Knight moves for the Knight located at row, col and add these moves to the list
     """
-    def getKnightMoves(self, r, c, moves):
-        piecePinned = False
+    def getKnightMoves(self, r, c, moves, captures=True, quiets=True):
         for i in range(len(self.pins)-1, -1, -1):
             if self.pins[i][0] == c and self.pins[i][1] == r:
-                piecePinned = True
-                self.pins.remove(self.pins[i])
-                break
-        potentialMoves = ((-1, -2), (-2, -1), (-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2))
-        allyColor = 'w' if self.whiteToMove == True else 'b'
-        for m in potentialMoves:
-            endRow = r + m[0]
-            endCol = c + m[1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:  # confine the potential moves to the board
-                if not piecePinned:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece[0] != allyColor:
-                        moves.append(Move((c, r), (endCol, endRow), self.board))
+                return  # a pinned knight can never move
+        enemyColor = 'b' if self.whiteToMove == True else 'w'
+        board = self.board
+        for endCol, endRow in KNIGHT_TARGETS[r * 8 + c]:
+            endPiece = board[endRow][endCol]
+            if (quiets and endPiece == '--') or (captures and endPiece[0] == enemyColor):
+                moves.append(Move((c, r), (endCol, endRow), board))
 
     """
     Get all King moves for the King located at row, col and add these moves to the list
     """
-    def getKingMoves(self, r, c, moves):
-        potentialMoves = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
-        allyColor = 'w' if self.whiteToMove == True else 'b'
-        for m in potentialMoves:
-            endRow = r + m[0]
-            endCol = c + m[1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:  # confine the potential moves to the board
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:  # empty or enemy piece
-                    if allyColor == 'w':  # place king on square and check for checks
-                        self.whiteKingLocation = (endCol, endRow)
-                    else:
-                        self.blackKingLocation = (endCol, endRow)
-                    inCheck, pins, checks = self.checkForPinsAndChecks()
-                    if not inCheck:
-                        moves.append(Move((c, r), (endCol, endRow), self.board))
-                    if allyColor == 'w':
-                        self.whiteKingLocation = (c, r)  # place king back on original location
-                    else:
-                        self.blackKingLocation = (c, r)
\ No newline at end of file
+    def getKingMoves(self, r, c, moves, captures=True, quiets=True):
+        enemyColor = 'b' if self.whiteToMove == True else 'w'
+        attacked = self.enemyAttacks
+        for endCol, endRow in KING_TARGETS[r * 8 + c]:
+            endPiece = self.board[endRow][endCol]
+            if (quiets and endPiece == '--') or (captures and endPiece[0] == enemyColor):  # empty or enemy piece
+                if not attacked[endRow * 8 + endCol]:  # the king may not move onto an attacked square
+                    moves.append(Move((c, r), (endCol, endRow), self.board))
\ No newline at end of file
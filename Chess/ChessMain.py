@@ -1,11 +1,15 @@
 """
 This is the main driver file.  It will be responsible for handling user input and displaying the current GameState object.
 """
-from multiprocessing import Process, Queue
+import logging
+import os
 from ChessGameState import GameState
-from ChessAI import findBestMove, findRandomMove
+from BitboardGameState import BitboardGameState
+from ChessAI import findRandomMove
+from EngineWorker import EngineProcess
 from Move import Move
-from DisplayFuncs import *
+if __name__ == "__main__":  # not when a spawned engine process imports this module as __mp_main__, which needs no pygame
+    from DisplayFuncs import *
 
 WIDTH = HEIGHT = 768
 DIMENSION = 8  # dimensions of chess board = 8x8
@@ -14,6 +18,9 @@ MAX_FPS = 15
 IMAGES = {}
 CHESS_DIR = os.path.dirname(__file__)
 colors = []
+USE_BITBOARDS = False  # True: the engine and the board use the bitboard move generator (BitboardGameState)
+PONDER = True  # True: the AI searches the reply it expects while the human is thinking
+SHOW_SEARCH_INFO = True  # True: the AI prints every iteration of its search and the search statistics
 
 """
 The main driver for our code.  This will handle user input and updating the graphics.
@@ -30,8 +37,9 @@ def main():
     moveMade = False
     gameOver = False
     AIThinking = False
-    chessAIProcess = None
-    gs = GameState()  # initialize the GameState, whiteToMove = True
+    gs = BitboardGameState() if USE_BITBOARDS else GameState()  # initialize the GameState, whiteToMove = True
+    engine = EngineProcess(USE_BITBOARDS, logging.INFO if SHOW_SEARCH_INFO else None)  # the AI searches in this process for the whole game, see EngineWorker.py
+    engine.newGame(gs.getFen())
     sqSelected = ()  # no square is selected initially.  Keeps track of last click of user (tuple: (col, row))
     playerClicks = []  # keep track of player clicks (two tuples: [(4, 7), (4, 5)])
 
@@ -73,8 +81,15 @@ def main():
                         print(playerClicks)
                         moveAttempt = Move(playerClicks[0], playerClicks[1], gs.board)  # creates object of class Move(startSq, endSq, board)
                         for i in range(len(validMoves)):
-                            if moveAttempt == validMoves[i]:  # if move is in all moves, make move, change moveMade variable, clear playerClicks.
+                            if moveAttempt.hasSameSquares(validMoves[i]):  # if move is in all moves, make move, change moveMade variable, clear playerClicks.
                                 gs.makeMove(validMoves[i])
+                                if engine.ponderMove is not None and validMoves[i].packed == engine.ponderMove:
+                                    engine.ponderHit()  # the AI guessed right and is already searching its reply
+                                    AIThinking = True
+                                else:
+                                    if engine.ponderMove is not None:
+                                        engine.stopPondering()
+                                    engine.makeMove(validMoves[i])
                                 moveMade = True
                                 sqSelected = ()
                                 playerClicks = []
@@ -85,13 +100,18 @@ def main():
 
             elif e.type == p.KEYDOWN and isHumanTurn:
                 if e.key == p.K_z and len(gs.moveLog) > 0:  # undo when 'z' is pressed.
+                    if engine.ponderMove is not None:
+                        engine.stopPondering()
                     if whitePlayer and blackPlayer:  # if both human players, undo the last human move
                         gs.undoMove()
+                        engine.undoMove()
                         validMoves = gs.getValidMoves()
                         gameOver = False
                     if whitePlayer and not blackPlayer:  # if only white human player
                         gs.undoMove()
                         gs.undoMove()
+                        engine.undoMove()
+                        engine.undoMove()
                         validMoves = gs.getValidMoves()
                         gameOver = False
 
@@ -112,21 +132,24 @@ def main():
         if not isHumanTurn and not gameOver:
             if not AIThinking:
                 AIThinking = True
-                returnQueue = Queue()
-                chessAIProcess = Process(target=findBestMove, args=(gs, validMoves, returnQueue))
-                chessAIProcess.start()
-
-            if not chessAIProcess.is_alive():  # if done thinking.
-                AIMove = returnQueue.get()
-                if AIMove is not None:
-                    gs.makeMove(AIMove)
-                    moveMade = True
-                else:  # if checkmate inevitable
-                    if validMoves:
-                        AIMove = findRandomMove(validMoves)
+                engine.go()
+
+            for message in engine.poll():
+                if message[0] == "bestmove":  # if done thinking.
+                    if message[1] is not None:
+                        AIMove = Move.fromPacked(message[1])
                         gs.makeMove(AIMove)
+                        engine.makeMove(AIMove)
                         moveMade = True
-                AIThinking = False
+                        if PONDER and (whitePlayer or blackPlayer):
+                            engine.ponder()
+                    else:  # if checkmate inevitable
+                        if validMoves:
+                            AIMove = findRandomMove(validMoves)
+                            gs.makeMove(AIMove)
+                            engine.makeMove(AIMove)
+                            moveMade = True
+                    AIThinking = False
 
 
         if moveMade:  # only calculate new moves after each turn, not each frame.
@@ -143,6 +166,8 @@ def main():
         p.display.flip()  # updates the full display Surface to the screen.
         drawGameState(screen, gs, validMoves, sqSelected)
 
+    engine.quit()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
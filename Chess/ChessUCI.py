@@ -0,0 +1,200 @@
+"""
+Headless UCI engine: speaks the Universal Chess Interface on stdin/stdout so the engine can be run by tournament managers
+and batch jobs.  Only GameState and ChessAI are imported, never pygame.
+
+Usage:  python ChessUCI.py [--bitboard]
+
+Supported commands: uci, isready, setoption (Hash, Threads), ucinewgame, position [startpos | fen <fen>] [moves ...],
+go [depth N] [movetime ms] [nodes N] [wtime ms] [btime ms] [winc ms] [binc ms] [movestogo N] [infinite] [ponder],
+ponderhit, stop, quit.  The search runs in a background thread so stop is handled while it thinks.  The engine only
+promotes to a queen, so a promotion to another piece is played as a queen promotion.
+"""
+import sys
+import threading
+import ChessAI
+from ChessGameState import GameState
+from BitboardGameState import BitboardGameState
+
+ENGINE_NAME = "Edward Hicks chess"
+ENGINE_AUTHOR = "Edward Hicks"
+DEFAULT_MOVES_TO_GO = 30  # moves a clock is shared between when the GUI doesn't say
+
+
+class UCIEngine:
+    def __init__(self, output, gameStateClass=GameState):
+        self.output = output
+        self.gameStateClass = gameStateClass
+        self.gs = gameStateClass()
+        self.searchThread = None
+        self.stopEvent = threading.Event()
+        self.holdBestMove = False  # infinite and ponder searches only answer after stop or ponderhit
+        self.releaseEvent = threading.Event()
+        self.ponderLimits = None
+        self.context = ChessAI.SearchContext()  # this engine's search tables and limits
+
+    def send(self, line):
+        self.output.write(line + "\n")
+        self.output.flush()
+
+    """
+    Handles one line of input.  Returns False after quit.
+    """
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {ChessAI.TT_SIZE_MB} min 1 max 4096")
+            self.send(f"option name Threads type spin default {ChessAI.SEARCH_WORKERS} min 1 max 64")
+            self.send("option name Ponder type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.setOption(args)
+        elif command == "ucinewgame":
+            self.waitForSearch()
+            self.context.clear()
+        elif command == "position":
+            self.waitForSearch()
+            self.setPosition(args)
+        elif command == "go":
+            self.waitForSearch()
+            self.go(args)
+        elif command == "ponderhit":
+            if self.ponderLimits is not None:
+                self.context.updateLimits(self.ponderLimits)
+                self.ponderLimits = None
+                self.holdBestMove = False
+                self.releaseEvent.set()
+        elif command == "stop":
+            self.stopEvent.set()
+            self.releaseEvent.set()
+        elif command == "quit":
+            self.stopEvent.set()
+            self.releaseEvent.set()
+            self.waitForSearch()
+            self.context.close()
+            return False
+        return True
+
+    def setOption(self, args):
+        if "name" not in args or "value" not in args:
+            return
+        name = " ".join(args[args.index("name") + 1:args.index("value")]).lower()
+        value = " ".join(args[args.index("value") + 1:])
+        self.waitForSearch()
+        if name == "hash":
+            self.context.resizeTable(int(value))
+        elif name == "threads":
+            self.context.workers = max(1, int(value))
+
+    """
+    position startpos [moves e2e4 e7e5 ...] or position fen <6 fields> [moves ...]
+    """
+    def setPosition(self, args):
+        if args and args[0] == "fen":
+            end = args.index("moves") if "moves" in args else len(args)
+            gs = self.gameStateClass(" ".join(args[1:end]))
+        else:
+            gs = self.gameStateClass()
+        if "moves" in args:
+            for notation in args[args.index("moves") + 1:]:
+                move = findMove(gs, notation)
+                if move is None:
+                    self.send(f"info string illegal move {notation}")
+                    break
+                gs.makeMove(move)
+        self.gs = gs
+
+    def go(self, args):
+        options = {}
+        i = 0
+        while i < len(args):
+            if args[i] in ("infinite", "ponder"):
+                options[args[i]] = True
+                i += 1
+            else:
+                options[args[i]] = int(args[i + 1]) if i + 1 < len(args) else 0
+                i += 2
+        limits = ChessAI.SearchLimits(maxDepth=options.get("depth"), maxNodes=options.get("nodes"))
+        if "movetime" in options:
+            limits.moveTime = options["movetime"] / 1000
+        clock = options.get("wtime" if self.gs.whiteToMove else "btime")
+        if clock is not None:
+            increment = options.get("winc" if self.gs.whiteToMove else "binc", 0)
+            movesToGo = options.get("movestogo", DEFAULT_MOVES_TO_GO)
+            limits.timeLimit = max(0.01, (clock / max(1, movesToGo) + increment * 0.8) / 1000)
+            limits.timeLimit = min(limits.timeLimit, clock / 1000 * 0.5)
+
+        self.stopEvent.clear()
+        self.releaseEvent.clear()
+        self.holdBestMove = "infinite" in options or "ponder" in options
+        if "ponder" in options:  # search without limits until ponderhit switches to the real ones
+            self.ponderLimits = limits
+            limits = ChessAI.SearchLimits(maxDepth=limits.maxDepth)
+        elif "infinite" in options:
+            limits = ChessAI.SearchLimits()
+        self.searchThread = threading.Thread(target=self.search, args=(self.gs, limits), daemon=True)
+        self.searchThread.start()
+
+    def search(self, gs, limits):
+        validMoves = gs.getValidMoves()
+        bestMove, stats = self.context.search(gs, validMoves, limits, lambda *info: self.sendInfo(gs, *info), self.stopEvent.is_set)
+        if self.holdBestMove:
+            self.releaseEvent.wait()
+        self.ponderLimits = None
+        if bestMove is None:
+            if not validMoves:  # mate 0 or a stalemate's cp 0
+                self.sendInfo(gs, 0, None, stats.score, 0, 0)
+            self.send("bestmove 0000")
+            return
+        gs.makeMove(bestMove)
+        ponderMove = self.context.principalVariation(gs, 1)
+        gs.undoMove()
+        self.send(f"bestmove {bestMove.getChessNotation()}" + (f" ponder {ponderMove[0].getChessNotation()}" if ponderMove else ""))
+
+    def sendInfo(self, gs, depth, move, score, nodes, seconds):
+        pv = self.context.pv or ([move] if move is not None else [])
+        if abs(score) >= ChessAI.MATE_THRESHOLD:  # a mate score is CHECKMATE less the plies to mate
+            movesToMate = (round(ChessAI.CHECKMATE - abs(score)) + 1) // 2
+            scoreText = f"mate {movesToMate if score > 0 else -movesToMate}"
+        else:
+            scoreText = f"cp {round(score * 100)}"
+        self.send(f"info depth {depth} score {scoreText} nodes {nodes} nps {int(nodes / seconds) if seconds > 0 else 0} "
+                  f"time {int(seconds * 1000)}" + (f" pv {' '.join(move.getChessNotation() for move in pv)}" if pv else ""))
+
+    def waitForSearch(self):
+        if self.searchThread is not None:
+            self.searchThread.join()
+            self.searchThread = None
+
+
+"""
+The legal move with the given long algebraic notation (e.g. e2e4, e7e8q), or None.
+"""
+def findMove(gs, notation):
+    for move in gs.getValidMoves():
+        if move.getChessNotation()[:4] == notation[:4]:
+            return move
+    return None
+
+
+def main(argv):
+    gameStateClass = BitboardGameState if "--bitboard" in argv else GameState
+    output = sys.stdout
+    sys.stdout = sys.stderr  # the search's progress prints must not mix with the protocol
+    engine = UCIEngine(output, gameStateClass)
+    for line in sys.stdin:
+        if not engine.handle(line.strip()):
+            return 0
+    if not engine.holdBestMove:  # end of input: let a batch job's last search finish
+        engine.waitForSearch()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,189 @@
+"""
+Runs ChessAI in one long-lived process for the whole game, so the transposition table, killer moves and history table
+stay warm between moves and no GameState has to be pickled for every AI move.
+
+The GUI and the worker talk over a multiprocessing Pipe with small tuples.  Moves are sent as their packed ints.
+
+GUI -> worker:
+    ("newgame", fen)      set up a new position (fen None = starting position) and clear the search caches
+    ("move", packed)      a move was played on the board
+    ("undo",)             the last move was taken back
+    ("go", limits)        search the current position; limits is a ChessAI.SearchLimits or None for the side's defaults
+    ("ponder", limits)    after the engine's move: play the reply the last search predicted and search the position after
+                          it without a time limit, until ponderhit or stop.  limits are used after a ponderhit
+    ("ponderhit",)        the predicted reply was played: the ponder search carries on as a normal search, with the
+                          time spent pondering counted against its time limit
+    ("stop",)             finish the current search now and send its best move.  Stopping a ponder search also takes
+                          back the predicted reply
+    ("quit",)             stop the worker
+
+worker -> GUI:
+    ("pondering", packed)                             reply to ponder: the predicted move, or None if there is none to
+                                                      ponder on (then no search is started)
+    ("info", depth, packed, score, nodes, seconds)     after every completed iteration of the search
+    ("bestmove", packed)                              the search result, packed is None if there is no legal move.  A
+                                                      ponder search only answers after ponderhit or stop
+"""
+from collections import deque
+import logging
+from multiprocessing import Process, Pipe
+import ChessAI
+from ChessGameState import GameState
+from BitboardGameState import BitboardGameState
+from Move import Move
+
+
+"""
+The worker process's main loop.  Commands that arrive during a search are kept and handled once it has finished,
+except stop and quit which end the search straight away.  logLevel, if given, shows the search's log (ChessAI logs
+every iteration and the search statistics at INFO) on stderr.
+"""
+def runWorker(conn, useBitboards=False, logLevel=None):
+    if logLevel is not None:
+        logging.basicConfig(level=logLevel, format="%(message)s")
+    gameStateClass = BitboardGameState if useBitboards else GameState
+    gs = gameStateClass()
+    context = ChessAI.SearchContext()
+    pending = deque()
+    ponderLimits = [None]  # limits a ponder search switches to on ponderhit; None when not pondering
+
+    def shouldStop():
+        while conn.poll():
+            message = conn.recv()
+            if message[0] == "ponderhit" and ponderLimits[0] is not None:
+                context.updateLimits(ponderLimits[0])
+                ponderLimits[0] = None
+            else:
+                pending.append(message)
+        return any(message[0] in ("stop", "quit") for message in pending)
+
+    def onIteration(depth, move, score, nodes, seconds):
+        conn.send(("info", depth, move.packed if move is not None else None, score, nodes, seconds))
+
+    def search(limits):
+        bestMove, stats = context.search(gs, gs.getValidMoves(), limits, onIteration, shouldStop)
+        return bestMove
+
+    def sendBestMove(bestMove):
+        conn.send(("bestmove", bestMove.packed if bestMove is not None else None))
+        # a stop has now been answered; a quit is still to be handled
+        for i in range(len(pending) - 1, -1, -1):
+            if pending[i][0] == "stop":
+                del pending[i]
+
+    while True:
+        try:
+            message = pending.popleft() if pending else conn.recv()
+        except EOFError:  # the GUI has gone
+            break
+        command = message[0]
+        if command == "quit":
+            break
+        elif command == "newgame":
+            gs = gameStateClass(message[1])
+            context.clear()
+        elif command == "move":
+            gs.makeMove(Move.fromPacked(message[1]))
+        elif command == "undo":
+            gs.undoMove()
+        elif command == "go":
+            sendBestMove(search(message[1]))
+        elif command == "ponder":
+            pv = context.principalVariation(gs, 1)
+            conn.send(("pondering", pv[0].packed if pv else None))
+            if not pv:
+                continue
+            gs.makeMove(pv[0])
+            ponderLimits[0] = message[1] if message[1] is not None else ChessAI.defaultLimits(gs)
+            bestMove = search(ChessAI.SearchLimits(maxDepth=ponderLimits[0].maxDepth))
+            while ponderLimits[0] is not None and not any(message[0] in ("stop", "quit") for message in pending):
+                conn.poll(None)  # the search finished early (e.g. found a mate): wait for ponderhit or stop
+                shouldStop()
+            if ponderLimits[0] is not None:  # stopped: the predicted reply was not played
+                ponderLimits[0] = None
+                gs.undoMove()
+            sendBestMove(bestMove)
+        # a stop or ponderhit with no search running needs no reply
+    context.close()
+    conn.close()
+
+
+"""
+The GUI's side of the worker: starts the process and wraps the pipe protocol.
+"""
+class EngineProcess:
+    def __init__(self, useBitboards=False, logLevel=None):
+        self.conn, workerConn = Pipe()
+        self.process = Process(target=runWorker, args=(workerConn, useBitboards, logLevel))  # not a daemon: it may start search workers
+        self.process.start()
+        workerConn.close()
+        self.thinking = False
+        self.ponderMove = None  # packed move being pondered on, None if not pondering
+        self.received = []  # messages read while waiting for a reply, returned by the next poll
+
+    def newGame(self, fen=None):
+        self.conn.send(("newgame", fen))
+
+    def makeMove(self, move):
+        self.conn.send(("move", move.packed))
+
+    def undoMove(self):
+        self.conn.send(("undo",))
+
+    def go(self, limits=None):
+        self.thinking = True
+        self.conn.send(("go", limits))
+
+    def stop(self):
+        self.conn.send(("stop",))
+
+    """
+    Starts pondering after the engine's move.  Returns the predicted reply as a packed move, or None if there is no
+    prediction and so no ponder search.
+    """
+    def ponder(self, limits=None):
+        self.conn.send(("ponder", limits))
+        while True:
+            message = self.conn.recv()
+            if message[0] == "pondering":
+                self.ponderMove = message[1]
+                return self.ponderMove
+            self.received.append(message)
+
+    """
+    The predicted reply was played: the ponder search becomes the search for the engine's next move.
+    """
+    def ponderHit(self):
+        self.conn.send(("ponderhit",))
+        self.ponderMove = None
+        self.thinking = True
+
+    """
+    A different move was played (or the game changed): stops the ponder search and waits until the worker has taken
+    back the predicted reply.
+    """
+    def stopPondering(self):
+        self.conn.send(("stop",))
+        while self.conn.recv()[0] != "bestmove":
+            pass
+        self.ponderMove = None
+
+    """
+    Returns the messages the worker has sent since the last poll, without waiting.  The search is finished once a
+    ("bestmove", packed) message has arrived; Move.fromPacked turns packed moves back into Moves.
+    """
+    def poll(self):
+        messages, self.received = self.received, []
+        while self.conn.poll():
+            message = self.conn.recv()
+            if message[0] == "bestmove":
+                self.thinking = False
+            messages.append(message)
+        return messages
+
+    def quit(self):
+        if self.ponderMove is not None:
+            self.stopPondering()
+        self.conn.send(("quit",))
+        self.process.join(timeout=5)
+        self.conn.close()
@@ -0,0 +1,166 @@
+"""
+Runs ChessAI.searchBestMove over an EPD test suite and records, for every position, whether the engine found the best
+move (bm) or avoided the bad move (am), the time to solution (when the iterative deepening search settled on a correct
+move), the total time, the nodes searched, the depth reached and the search statistics (SearchStats.py).  The results are
+written as a JSON report so runs can be compared across engine versions.
+
+Usage:  python EpdSuite.py suites/wac_sample.epd [--depth N] [--time seconds] [--bitboard] [--workers N] [--out report.json]
+
+--workers N searches with N processes (ChessAI.SEARCH_WORKERS), e.g. to measure time to depth on a multi-core machine.
+"""
+import json
+import sys
+import time
+import ChessAI
+from ChessGameState import GameState
+from BitboardGameState import BitboardGameState
+from Notation import getSAN, normaliseSAN, parseSAN
+
+
+"""
+Splits one EPD line into its FEN (with default move clocks) and a dictionary of operations, e.g.
+{'bm': ['Qg6'], 'id': ['WAC.001']}.  Returns None for blank lines and comments.
+"""
+def parseEpdLine(line):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"EPD line needs 4 position fields: {line}")
+    fen = " ".join(fields[:4]) + " 0 1"
+    operations = {}
+    if len(fields) == 5:
+        for operation in fields[4].split(";"):
+            parts = operation.strip().split(None, 1)
+            if parts:
+                operands = parts[1] if len(parts) > 1 else ""
+                if operands.startswith('"'):
+                    operations[parts[0]] = [operands.strip('"')]
+                else:
+                    operations[parts[0]] = operands.split()
+    return fen, operations
+
+
+"""
+Reads every position in an EPD file.  Returns a list of (fen, operations).
+"""
+def loadEpdFile(path):
+    positions = []
+    with open(path) as epdFile:
+        for line in epdFile:
+            position = parseEpdLine(line)
+            if position is not None:
+                positions.append(position)
+    return positions
+
+
+"""
+Searches one EPD position to the given depth, or for moveTime seconds, and returns its result record.
+"""
+def runPosition(fen, operations, depth, moveTime=None, gameStateClass=GameState):
+    gs = gameStateClass(fen)
+    validMoves = gs.getValidMoves()
+    bestMoves = [normaliseSAN(getSAN(gs, parseSAN(gs, san, validMoves), validMoves)) for san in operations.get("bm", [])]
+    avoidMoves = [normaliseSAN(getSAN(gs, parseSAN(gs, san, validMoves), validMoves)) for san in operations.get("am", [])]
+
+    def isSolution(move):
+        playedMove = normaliseSAN(getSAN(gs, move, validMoves, withCheck=False))
+        return (not bestMoves or playedMove in bestMoves) and playedMove not in avoidMoves
+
+    # time of the iteration since which the best move has been a solution
+    solutionTime = [None]
+    def onIteration(iterationDepth, move, score, nodes, seconds):
+        if move is not None and isSolution(move):
+            if solutionTime[0] is None:
+                solutionTime[0] = seconds
+        else:
+            solutionTime[0] = None
+
+    limits = ChessAI.SearchLimits(maxDepth=depth, moveTime=moveTime)
+    startTime = time.time()
+    move, stats = ChessAI.searchBestMove(gs, list(validMoves), limits, onIteration)
+    elapsed = time.time() - startTime
+
+    san = getSAN(gs, move, gs.getValidMoves()) if move is not None else None
+    solved = move is not None and isSolution(move)
+    return {
+        "id": operations.get("id", [fen])[0],
+        "fen": fen,
+        "bm": operations.get("bm", []),
+        "am": operations.get("am", []),
+        "move": san,
+        "solved": solved,
+        "timeToSolution": round(solutionTime[0], 4) if solved and solutionTime[0] is not None else None,
+        "time": round(elapsed, 4),
+        "nodes": stats.nodes,
+        "depth": stats.depth,
+        "stats": stats.toDict(),
+    }
+
+
+"""
+Runs every position of an EPD suite to a fixed depth, or for moveTime seconds each.  Returns the report dictionary.
+"""
+def runSuite(path, depth, moveTime=None, gameStateClass=GameState):
+    results = []
+    for fen, operations in loadEpdFile(path):
+        result = runPosition(fen, operations, depth, moveTime, gameStateClass)
+        results.append(result)
+        print(f"{result['id']}: {'solved' if result['solved'] else 'unsolved'}  move: {result['move']}  "
+              f"Time: {result['time']:.2f}s  nodes: {result['nodes']}  depth: {result['depth']}")
+
+    totalTime = sum(result["time"] for result in results)
+    totalNodes = sum(result["nodes"] for result in results)
+    return {
+        "suite": path,
+        "gameState": gameStateClass.__name__,
+        "workers": ChessAI.SEARCH_WORKERS,
+        "depth": depth,
+        "moveTime": moveTime,
+        "positions": results,
+        "summary": {
+            "solved": sum(1 for result in results if result["solved"]),
+            "total": len(results),
+            "time": round(totalTime, 4),
+            "nodes": totalNodes,
+            "nps": round(totalNodes / totalTime) if totalTime > 0 else 0,
+        },
+    }
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 1
+    path, depth, moveTime, outPath, gameStateClass = argv[0], ChessAI.WhiteDepth, None, None, GameState
+    i = 1
+    while i < len(argv):
+        if argv[i] == "--depth":
+            i += 1
+            depth = int(argv[i])
+        elif argv[i] == "--time":
+            i += 1
+            moveTime = float(argv[i])
+            depth = 64
+        elif argv[i] == "--bitboard":
+            gameStateClass = BitboardGameState
+        elif argv[i] == "--workers":
+            i += 1
+            ChessAI.SEARCH_WORKERS = int(argv[i])
+        elif argv[i] == "--out":
+            i += 1
+            outPath = argv[i]
+        i += 1
+
+    report = runSuite(path, depth, moveTime, gameStateClass)
+    summary = report["summary"]
+    print(f"solved {summary['solved']}/{summary['total']}     Time: {summary['time']:.2f}s     nps: {summary['nps']}")
+    if outPath is not None:
+        with open(outPath, "w") as outFile:
+            json.dump(report, outFile, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,43 +1,115 @@
 """
-Defines the move class that is passed into the move functions of the GameState
+Defines the move class that is passed into the move functions of the GameState, and the castling rights bits
+(WKS, WQS, BKS, BQS) that GameState.castleRights is made of
 """
+# piece codes used in packed moves: 0 = empty, white pieces 1-6, black pieces 9-14 (bit 3 is the colour)
+PIECE_CODES = {"--": 0, "wp": 1, "wN": 2, "wB": 3, "wR": 4, "wQ": 5, "wK": 6, "bp": 9, "bN": 10, "bB": 11, "bR": 12, "bQ": 13, "bK": 14}
+CODE_PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+
+# layout of Move.packed
+START_SHIFT, END_SHIFT, MOVED_SHIFT, CAPTURED_SHIFT = 0, 6, 12, 16  # squares are row * 8 + col
+ENPASSANT_FLAG, CASTLE_FLAG, PROMOTION_FLAG = 1 << 20, 1 << 21, 1 << 22
+SQUARES_MASK = (1 << MOVED_SHIFT) - 1
+
+
 class Move:
+    # maps between board coordinates and rank/file notation
+    filesToCols = {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7}
+    colsToFiles = {v: k for k, v in filesToCols.items()}
+    ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4, "5": 3, "6": 2, "7": 1, "8": 0}
+    rowsToRanks = {v: k for k, v in ranksToRows.items()}
+
+    # no per-move __dict__: a search creates hundreds of thousands of these
+    __slots__ = ("startCol", "startRow", "endCol", "endRow", "pieceMoved", "pieceCaptured",
+                 "isPawnPromotion", "isEnpassantMove", "isCastleMove", "packed")
 
     def __init__(self, startSq, endSq, board, isEnpassantMove=False, isCastleMove=False):  # ((startCol, startRow), (endCol, endRow), board)
         # position of mouse click is format sqSelected: (col, row)
-        self.startCol = startSq[0]
-        self.startRow = startSq[1]
-        self.endCol = endSq[0]
-        self.endRow = endSq[1]
-        self.pieceMoved = board[self.startRow][self.startCol]
-        self.pieceCaptured = board[self.endRow][self.endCol]
-
-        self.moveID = f"C{self.startCol:01d}R{self.startRow:01d} -> C{self.endCol:01d}R{self.endRow:01d}"
+        self.startCol = startCol = startSq[0]
+        self.startRow = startRow = startSq[1]
+        self.endCol = endCol = endSq[0]
+        self.endRow = endRow = endSq[1]
+        self.pieceMoved = pieceMoved = board[startRow][startCol]
+        self.pieceCaptured = pieceCaptured = board[endRow][endCol]
 
-        self.isPawnPromotion = (self.pieceMoved == 'wp' and self.endRow == 0) or (self.pieceMoved == 'bp' and self.endRow == 7)
+        self.isPawnPromotion = (pieceMoved == 'wp' and endRow == 0) or (pieceMoved == 'bp' and endRow == 7)
 
         # enpassant
         self.isEnpassantMove = isEnpassantMove
-        if self.isEnpassantMove:
-            self.pieceCaptured = 'wp' if self.pieceMoved == 'bp' else 'bp'
+        if isEnpassantMove:
+            self.pieceCaptured = pieceCaptured = 'wp' if pieceMoved == 'bp' else 'bp'
 
         # castle
         self.isCastleMove = isCastleMove
 
+        # everything about the move in one int: squares, piece codes and flags
+        self.packed = ((startRow * 8 + startCol) | (endRow * 8 + endCol) << END_SHIFT | PIECE_CODES[pieceMoved] << MOVED_SHIFT
+                       | PIECE_CODES[pieceCaptured] << CAPTURED_SHIFT | (ENPASSANT_FLAG if isEnpassantMove else 0)
+                       | (CASTLE_FLAG if isCastleMove else 0) | (PROMOTION_FLAG if self.isPawnPromotion else 0))
+
+    """
+    Rebuilds a move from its packed int.
+    """
+    @classmethod
+    def fromPacked(cls, packed):
+        move = cls.__new__(cls)
+        startSq, endSq = packed & 63, packed >> END_SHIFT & 63
+        move.startCol, move.startRow = startSq & 7, startSq >> 3
+        move.endCol, move.endRow = endSq & 7, endSq >> 3
+        move.pieceMoved = CODE_PIECES[packed >> MOVED_SHIFT & 15]
+        move.pieceCaptured = CODE_PIECES[packed >> CAPTURED_SHIFT & 15]
+        move.isEnpassantMove = packed & ENPASSANT_FLAG != 0
+        move.isCastleMove = packed & CASTLE_FLAG != 0
+        move.isPawnPromotion = packed & PROMOTION_FLAG != 0
+        move.packed = packed
+        return move
+
+    # pickle moves as their packed int
+    def __reduce__(self):
+        return Move.fromPacked, (self.packed,)
+
+    """
+    Move ID for printing, e.g. C4R6 -> C4R4.  Built on demand rather than for every generated move.
+    """
+    @property
+    def moveID(self):
+        return f"C{self.startCol:01d}R{self.startRow:01d} -> C{self.endCol:01d}R{self.endRow:01d}"
 
     """
     Overriding the equals method. Only needed as we are using a class, would not be needed if we used strings, ints etc.
     """
     def __eq__(self, other):
-        if isinstance(other, Move):  # if object other is class Move, then two moves are equivalent if their IDs are equivalent
-            return self.moveID == other.moveID
+        if isinstance(other, Move):  # if object other is class Move, then two moves are equivalent if their packed ints are equivalent
+            return self.packed == other.packed
         return False
 
+    def __hash__(self):
+        return self.packed
+
+    """
+    True if both moves go from and to the same squares.  Used to match a move clicked on the board, which can't know if
+    it is an en passant or castle move.
+    """
+    def hasSameSquares(self, other):
+        return (self.packed ^ other.packed) & SQUARES_MASK == 0
+
+    def __repr__(self):
+        return f"Move({self.getChessNotation()})"
+
+    """
+    Long algebraic notation of the move, e.g. e2e4 or e7e8q.  Promotions are always to a queen.
+    """
+    def getChessNotation(self):
+        notation = self.getRankFile(self.startCol, self.startRow) + self.getRankFile(self.endCol, self.endRow)
+        if self.isPawnPromotion:
+            notation += "q"
+        return notation
+
+    def getRankFile(self, c, r):
+        return self.colsToFiles[c] + self.rowsToRanks[r]
+
 
 
-class CastleRights:
-    def __init__(self, wks, bks, wqs, bqs):
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
\ No newline at end of file
+# castling rights still available, as the bits of GameState.castleRights
+WKS, WQS, BKS, BQS = 1, 2, 4, 8
+ALL_CASTLE_RIGHTS = WKS | WQS | BKS | BQS
@@ -0,0 +1,93 @@
+"""
+Move ordering for the search.  Alpha-beta prunes the most when the best move is searched first, so every node sorts its
+moves by how likely they are to cause a beta cutoff:
+
+ - captures and promotions by MVV-LVA (most valuable victim, least valuable attacker), read from the move's packed
+   piece codes so no board lookups are needed
+ - killer moves: the last two quiet moves that caused a cutoff at the same ply, which often refute a sibling position too
+ - the history table: how often a quiet move from/to the same squares caused cutoffs anywhere in the tree
+"""
+from array import array
+from Move import MOVED_SHIFT, CAPTURED_SHIFT, PROMOTION_FLAG, SQUARES_MASK
+
+PIECE_VALUES = (0, 1, 3, 3, 5, 9, 10, 0)  # indexed by piece code & 7: empty, p, N, B, R, Q, K
+CAPTURE_BONUS = 1 << 30  # captures are searched before killers, killers before the rest of the quiet moves
+KILLER_BONUS = 1 << 29
+HISTORY_LIMIT = 1 << 20  # history scores are halved when one reaches this, so recent cutoffs count for more
+MAX_PLY = 128
+
+
+"""
+MVV-LVA score of a capture or promotion.
+"""
+def captureScore(move):
+    packed = move.packed
+    score = PIECE_VALUES[packed >> CAPTURED_SHIFT & 7] * 16 - PIECE_VALUES[packed >> MOVED_SHIFT & 7]
+    if packed & PROMOTION_FLAG:
+        score += PIECE_VALUES[5] * 16
+    return score
+
+
+class MoveOrdering:
+    def __init__(self):
+        self.killers = array('l', [-1]) * (MAX_PLY * 2)  # two packed moves per ply, most recent first
+        self.history = array('l', bytes(8 * 2 * 4096))  # indexed by colour, from square and to square
+
+    """
+    Called at the start of every search.  Killers are only meaningful for the position they were found in, history
+    is kept but aged.
+    """
+    def newSearch(self):
+        self.killers = array('l', [-1]) * (MAX_PLY * 2)
+        self.ageHistory()
+
+    """
+    Forgets everything, e.g. for a new game.
+    """
+    def clear(self):
+        self.killers = array('l', [-1]) * (MAX_PLY * 2)
+        self.history = array('l', bytes(8 * 2 * 4096))
+
+    def ageHistory(self):
+        history = self.history
+        for i in range(len(history)):
+            history[i] >>= 1
+
+    """
+    Sort key for a quiet move at the given ply: killers first, then by history.
+    """
+    def quietScore(self, move, ply):
+        packed = move.packed
+        if packed == self.killers[ply * 2] or packed == self.killers[ply * 2 + 1]:
+            return KILLER_BONUS
+        return self.history[(packed >> MOVED_SHIFT & 8) << 9 | packed & SQUARES_MASK]
+
+    """
+    Sort key for any move: captures and promotions, then killers, then history.
+    """
+    def moveScore(self, move, ply):
+        if move.pieceCaptured != "--" or move.isPawnPromotion:
+            return CAPTURE_BONUS + captureScore(move)
+        return self.quietScore(move, ply)
+
+    """
+    Sorts a list of moves best first.
+    """
+    def sortMoves(self, moves, ply):
+        moves.sort(reverse=True, key=lambda move: self.moveScore(move, ply))
+
+    """
+    Records that move caused a beta cutoff at ply with the given remaining depth.  Only quiet moves are remembered:
+    captures are already searched first.
+    """
+    def storeCutoff(self, move, ply, depth):
+        if move.pieceCaptured != "--" or move.isPawnPromotion or ply >= MAX_PLY:
+            return
+        packed = move.packed
+        if self.killers[ply * 2] != packed:
+            self.killers[ply * 2 + 1] = self.killers[ply * 2]
+            self.killers[ply * 2] = packed
+        i = (packed >> MOVED_SHIFT & 8) << 9 | packed & SQUARES_MASK
+        self.history[i] += depth * depth
+        if self.history[i] >= HISTORY_LIMIT:
+            self.ageHistory()
@@ -0,0 +1,70 @@
+"""
+Standard algebraic notation (SAN) for moves, e.g. Nf3, exd5, O-O, e8=Q+.  Used to read and write EPD and PGN files.
+"""
+from Move import Move
+
+
+"""
+Returns the SAN of a move in the current position.  validMoves are the legal moves in the position, and are generated
+if not given.  If withCheck, the move is made and undone to add the check/checkmate suffix.
+"""
+def getSAN(gs, move, validMoves=None, withCheck=True):
+    if validMoves is None:
+        validMoves = gs.getValidMoves()
+
+    if move.isCastleMove:
+        san = "O-O" if move.endCol > move.startCol else "O-O-O"
+    else:
+        piece = move.pieceMoved[1]
+        isCapture = move.pieceCaptured != "--"
+        destination = move.getRankFile(move.endCol, move.endRow)
+        if piece == 'p':
+            san = (Move.colsToFiles[move.startCol] + "x" if isCapture else "") + destination
+            if move.isPawnPromotion:
+                san += "=Q"
+        else:
+            # other pieces of the same type that can also reach the destination square
+            rivals = [m for m in validMoves if m.pieceMoved == move.pieceMoved and m.endCol == move.endCol and m.endRow == move.endRow
+                      and (m.startCol, m.startRow) != (move.startCol, move.startRow)]
+            disambiguation = ""
+            if rivals:
+                if all(m.startCol != move.startCol for m in rivals):
+                    disambiguation = Move.colsToFiles[move.startCol]
+                elif all(m.startRow != move.startRow for m in rivals):
+                    disambiguation = Move.rowsToRanks[move.startRow]
+                else:
+                    disambiguation = move.getRankFile(move.startCol, move.startRow)
+            san = piece + disambiguation + ("x" if isCapture else "") + destination
+
+    if not withCheck:
+        return san
+    gs.makeMove(move)
+    replies = gs.getValidMoves()
+    if gs.inCheck:
+        san += "+" if replies else "#"
+    gs.undoMove()
+    return san
+
+
+"""
+Strips the parts of a SAN string that don't identify the move: check marks, annotations, capture and promotion marks.
+"""
+def normaliseSAN(san):
+    san = san.strip().replace("0-0-0", "O-O-O").replace("0-0", "O-O")
+    for char in "+#!?x=":
+        san = san.replace(char, "")
+    return san
+
+
+"""
+Finds the legal move matching a SAN string (long algebraic notation, e.g. e2e4, is also accepted).
+Raises ValueError if there is no such move.
+"""
+def parseSAN(gs, san, validMoves=None):
+    if validMoves is None:
+        validMoves = gs.getValidMoves()
+    target = normaliseSAN(san)
+    for move in validMoves:
+        if normaliseSAN(getSAN(gs, move, validMoves, withCheck=False)) == target or move.getChessNotation() == san.strip().lower():
+            return move
+    raise ValueError(f"no legal move matches '{san}' in {gs.getFen()}")
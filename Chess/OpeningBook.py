@@ -0,0 +1,193 @@
+"""
+Binary opening book.  The file is a list of 16 byte records sorted by key, in the Polyglot layout (big endian):
+
+    key     8 bytes   Zobrist key of the position (from Zobrist.py, so Polyglot's own books can't be read)
+    move    2 bytes   to file | to rank << 3 | from file << 6 | from rank << 9 (files a-h = 0-7, ranks 1-8 = 0-7),
+                      castling is stored as the king's two square move
+    weight  2 bytes   how good the move is: wins count 2, draws 1, losses 0 for the side that played it
+    learn   4 bytes   unused, 0
+
+The book is memory mapped and probed with a binary search, so looking up a position needs no loading or parsing.
+
+Usage:  python OpeningBook.py build games.pgn book.bin [--plies N]
+        python OpeningBook.py probe book.bin [--fen FEN]
+"""
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+from ChessGameState import GameState
+from Notation import getSAN, parseSAN
+
+RECORD = struct.Struct(">QHHI")
+BOOK_PLIES = 20  # moves after this many plies are not put in the book
+MAX_WEIGHT = 0xFFFF
+
+
+"""
+A move as its 16 bit book encoding.
+"""
+def encodeMove(move):
+    return move.endCol | (7 - move.endRow) << 3 | move.startCol << 6 | (7 - move.startRow) << 9
+
+
+"""
+The legal move a 16 bit book move stands for, or None.
+"""
+def decodeMove(bookMove, validMoves):
+    endCol, endRow = bookMove & 7, 7 - (bookMove >> 3 & 7)
+    startCol, startRow = bookMove >> 6 & 7, 7 - (bookMove >> 9 & 7)
+    for move in validMoves:
+        if (move.startCol, move.startRow, move.endCol, move.endRow) == (startCol, startRow, endCol, endRow):
+            return move
+    return None
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.entries = size // RECORD.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self):
+        if self.entries:
+            self.data.close()
+        self.file.close()
+
+    """
+    Returns the (bookMove, weight) records stored for a position key.
+    """
+    def getEntries(self, key):
+        low, high = 0, self.entries  # binary search for the first record with this key
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(self.data, middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.entries:
+            entryKey, bookMove, weight, learn = RECORD.unpack_from(self.data, low * RECORD.size)
+            if entryKey != key:
+                break
+            entries.append((bookMove, weight))
+            low += 1
+        return entries
+
+    """
+    Picks a book move for the position, at random in proportion to the weights.  Returns None if the position is not
+    in the book (or none of its moves is legal, e.g. after a key collision).
+    """
+    def probe(self, gs, validMoves=None, rng=random):
+        entries = self.getEntries(gs.zobristKey)
+        if not entries:
+            return None
+        if validMoves is None:
+            validMoves = gs.getValidMoves()
+        candidates = [(decodeMove(bookMove, validMoves), weight) for bookMove, weight in entries]
+        candidates = [(move, weight) for move, weight in candidates if move is not None]
+        if not candidates:
+            return None
+        total = sum(weight for move, weight in candidates)
+        if total == 0:
+            return rng.choice(candidates)[0]
+        pick = rng.uniform(0, total)
+        for move, weight in candidates:
+            pick -= weight
+            if pick <= 0:
+                return move
+        return candidates[-1][0]
+
+
+"""
+Reads the games of a PGN file.  Yields (list of SAN moves, result), result being "1-0", "0-1", "1/2-1/2" or "*".
+Comments, variations and numeric annotations are skipped.
+"""
+def readPgnGames(path):
+    with open(path) as pgnFile:
+        text = pgnFile.read()
+    result, moveText = "*", []
+    for line in text.splitlines() + ["[Event"]:  # the sentinel header ends the last game
+        line = line.strip()
+        if line.startswith("["):
+            if moveText:
+                yield parseMoveText(" ".join(moveText)), result
+                result, moveText = "*", []
+            match = re.match(r'\[Result "([^"]*)"\]', line)
+            if match:
+                result = match.group(1)
+        elif line:
+            moveText.append(line)
+
+
+def parseMoveText(moveText):
+    moveText = re.sub(r"\{[^}]*\}|;[^\n]*|\$\d+", " ", moveText)
+    while "(" in moveText:  # variations may be nested, remove the innermost first
+        moveText = re.sub(r"\([^()]*\)", " ", moveText)
+    moves = []
+    for token in moveText.split():
+        token = re.sub(r"^\d+\.+", "", token)
+        if token and token not in ("1-0", "0-1", "1/2-1/2", "*"):
+            moves.append(token)
+    return moves
+
+
+"""
+Builds a book from games of SAN moves.  Every move of the first `plies` plies is recorded under the position it was
+played from, weighted by the result for the side that played it.  Games stop being read at an illegal or unsupported
+move (e.g. an under-promotion).  Returns the number of records written.
+"""
+def buildBook(games, path, plies=BOOK_PLIES):
+    weights = {}  # (key, bookMove): weight
+    for sanMoves, result in games:
+        gs = GameState()
+        for san in sanMoves[:plies]:
+            try:
+                move = parseSAN(gs, san)
+            except ValueError:
+                break
+            if result == "1-0":
+                score = 2 if gs.whiteToMove else 0
+            elif result == "0-1":
+                score = 0 if gs.whiteToMove else 2
+            else:
+                score = 1  # draws, and games without a result, count every move once
+            entry = (gs.zobristKey, encodeMove(move))
+            weights[entry] = min(MAX_WEIGHT, weights.get(entry, 0) + score)
+            gs.makeMove(move)
+
+    with open(path, "wb") as bookFile:
+        for (key, bookMove), weight in sorted(weights.items()):
+            bookFile.write(RECORD.pack(key, bookMove, weight, 0))
+    return len(weights)
+
+
+def main(argv):
+    if len(argv) >= 3 and argv[0] == "build":
+        plies = int(argv[argv.index("--plies") + 1]) if "--plies" in argv else BOOK_PLIES
+        records = buildBook(readPgnGames(argv[1]), argv[2], plies)
+        print(f"{records} book entries written to {argv[2]}")
+        return 0
+    if len(argv) >= 2 and argv[0] == "probe":
+        gs = GameState(" ".join(argv[argv.index("--fen") + 1:]) if "--fen" in argv else None)
+        book = OpeningBook(argv[1])
+        validMoves = gs.getValidMoves()
+        entries = book.getEntries(gs.zobristKey)
+        total = sum(weight for bookMove, weight in entries)
+        for bookMove, weight in sorted(entries, key=lambda entry: -entry[1]):
+            move = decodeMove(bookMove, validMoves)
+            name = getSAN(gs, move, validMoves) if move is not None else f"illegal move {bookMove:#06x}"
+            print(f"{name:8} weight {weight:5}  {weight / total:.0%}" if total else f"{name:8} weight {weight}")
+        if not entries:
+            print("position not in book")
+        book.close()
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
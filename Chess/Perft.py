@@ -0,0 +1,214 @@
+"""
+Perft (performance test) harness for the GameState move generator.  Walks the move tree to a fixed depth using
+getValidMoves, makeMove and undoMove, counting the leaf nodes.  The counts are compared against published reference
+values to check legality, and the run time gives a nodes per second figure for comparing move generation changes.
+
+Usage:  python Perft.py [depth] [--position name | --fen FEN] [--divide] [--workers N] [--bitboard] [--moves e2e4 e7e5 ...]
+        python Perft.py [depth] --suite     (checks every test position up to depth)
+        python Perft.py [depth] --compare   (cross-checks BitboardGameState against GameState and compares their speed)
+"""
+import sys
+import time
+from multiprocessing import Pool
+from ChessGameState import GameState, STARTING_FEN
+from BitboardGameState import BitboardGameState
+
+# standard test positions and their known leaf counts: name: (fen, {depth: nodes}).
+# The engine always promotes to a queen, so counts are only listed to depths where no promotions occur.
+PERFT_POSITIONS = {
+    "start": (STARTING_FEN, {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609, 6: 119060324}),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", {1: 48, 2: 2039, 3: 97862}),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    "position6": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+}
+
+
+"""
+Counts the leaf nodes of the move tree below the current position, depth plies deep.
+"""
+def perft(gs, depth):
+    if depth == 0:
+        return 1
+    moves = gs.getValidMoves()
+    if depth == 1:  # bulk count: the leaves are the moves themselves
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs, depth - 1)
+        gs.undoMove()
+    return nodes
+
+
+"""
+Worker for the process pool.  Makes one root move and counts the subtree below it.
+"""
+def perftRootMove(args):
+    gs, move, depth = args
+    gs.makeMove(move)
+    return perft(gs, depth - 1)
+
+
+"""
+Splits the perft count by root move.  Returns a list of (move, nodes), in move generation order.
+With workers > 1 the root moves are shared out across a process pool.
+"""
+def divide(gs, depth, workers=1):
+    rootMoves = gs.getValidMoves()
+    if depth <= 1:
+        return [(move, 1) for move in rootMoves]
+    if workers > 1:
+        with Pool(workers) as pool:
+            counts = pool.map(perftRootMove, [(gs, move, depth) for move in rootMoves], chunksize=1)
+    else:
+        counts = []
+        for move in rootMoves:
+            gs.makeMove(move)
+            counts.append(perft(gs, depth - 1))
+            gs.undoMove()
+    return list(zip(rootMoves, counts))
+
+
+"""
+Plays a list of moves in long algebraic notation (e.g. ['e2e4', 'e7e5']) from the current position.
+"""
+def playMoves(gs, notations):
+    for notation in notations:
+        for move in gs.getValidMoves():
+            if move.getChessNotation() == notation:
+                gs.makeMove(move)
+                break
+        else:
+            raise ValueError(f"illegal move in move list: {notation}")
+
+
+"""
+Runs perft on gs to the given depth and prints the leaf count, the nodes per second and, if asked, the per root move
+breakdown.  If expected counts are given the result is checked against them.  Returns True if the count is correct (or
+there is no reference count for the depth).
+"""
+def runPerft(gs, depth, workers=1, showDivide=False, expected=None):
+    startTime = time.time()
+    results = divide(gs, depth, workers)
+    elapsed = time.time() - startTime
+    nodes = sum(count for move, count in results)
+
+    if showDivide:
+        for move, count in sorted(results, key=lambda result: result[0].getChessNotation()):
+            print(f"{move.getChessNotation()}: {count}")
+        print(f"moves: {len(results)}")
+
+    nps = nodes / elapsed if elapsed > 0 else 0
+    correct = expected is None or depth not in expected or expected[depth] == nodes
+    status = "" if expected is None or depth not in expected else ("  OK" if correct else f"  FAIL (expected {expected[depth]})")
+    print(f"depth {depth}: {nodes} nodes     Time: {elapsed:.2f}s     nps: {nps:.0f}{status}")
+    return correct
+
+
+"""
+Checks every test position at each of its reference depths up to maxDepth.  Returns True if all counts are correct.
+"""
+def runSuite(maxDepth, workers=1, gameStateClass=GameState):
+    allCorrect = True
+    for name, (fen, expected) in PERFT_POSITIONS.items():
+        print(f"{name}: {fen}")
+        for depth in sorted(expected):
+            if depth <= maxDepth:
+                allCorrect = runPerft(gameStateClass(fen), depth, workers, expected=expected) and allCorrect
+    return allCorrect
+
+
+"""
+Runs divide on the same position with GameState and BitboardGameState and prints where their counts differ, following
+the first differing move down to the position whose move lists differ.  Returns (nodes, GameState time, bitboard time),
+or None if the counts differ.
+"""
+def crossCheck(fen, depth, moves=()):
+    results = []
+    for gameStateClass in (GameState, BitboardGameState):
+        gs = gameStateClass(fen)
+        playMoves(gs, moves)
+        startTime = time.time()
+        counts = {move.getChessNotation(): count for move, count in divide(gs, depth)}
+        results.append((counts, time.time() - startTime))
+    (counts, gameStateTime), (bitboardCounts, bitboardTime) = results
+
+    if counts == bitboardCounts:
+        return sum(counts.values()), gameStateTime, bitboardTime
+    path = " ".join(moves) or "root"
+    for notation in sorted(set(counts) | set(bitboardCounts)):
+        if notation not in bitboardCounts:
+            print(f"after {path}: {notation} is only generated by GameState")
+        elif notation not in counts:
+            print(f"after {path}: {notation} is only generated by BitboardGameState")
+        elif counts[notation] != bitboardCounts[notation]:
+            print(f"after {path}: {notation} GameState {counts[notation]}, BitboardGameState {bitboardCounts[notation]}")
+            if depth > 1:
+                crossCheck(fen, depth - 1, tuple(moves) + (notation,))
+            break
+    return None
+
+
+"""
+Cross-checks the two GameState implementations on every test position and prints their nodes per second.
+Returns True if they agree everywhere.
+"""
+def runCrossCheck(depth):
+    allAgree = True
+    for name, (fen, expected) in PERFT_POSITIONS.items():
+        result = crossCheck(fen, depth)
+        if result is None:
+            print(f"{name}: MISMATCH")
+            allAgree = False
+            continue
+        nodes, gameStateTime, bitboardTime = result
+        print(f"{name}: {nodes} nodes     GameState nps: {nodes / gameStateTime:.0f}     "
+              f"BitboardGameState nps: {nodes / bitboardTime:.0f}     speedup: {gameStateTime / bitboardTime:.2f}x")
+    return allAgree
+
+
+def main(argv):
+    depth, workers, showDivide, moves = 4, 1, False, []
+    fen, expected, suite, compare, gameStateClass = STARTING_FEN, PERFT_POSITIONS["start"][1], False, False, GameState
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--divide":
+            showDivide = True
+        elif arg == "--suite":
+            suite = True
+        elif arg == "--compare":
+            compare = True
+        elif arg == "--bitboard":
+            gameStateClass = BitboardGameState
+        elif arg == "--workers":
+            i += 1
+            workers = int(argv[i])
+        elif arg == "--position":
+            i += 1
+            fen, expected = PERFT_POSITIONS[argv[i]]
+        elif arg == "--fen":
+            i += 1
+            fen, expected = argv[i], None
+        elif arg == "--moves":
+            moves = argv[i + 1:]
+            break
+        else:
+            depth = int(arg)
+        i += 1
+
+    if compare:
+        return 0 if runCrossCheck(depth) else 1
+    if suite:
+        return 0 if runSuite(depth, workers, gameStateClass) else 1
+
+    gs = gameStateClass(fen)
+    playMoves(gs, moves)
+    if moves:
+        expected = None
+    correct = runPerft(gs, depth, workers, showDivide, expected)
+    return 0 if correct else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -45,17 +45,35 @@ whitePawnScore = [ [6, 6, 6, 6, 6, 6, 6, 6],
                    [1, 1, 1, 0, 0, 1, 1, 1],
                    [0, 0, 0, 0, 0, 0, 0, 0]]
 
-piecePositionScores = {
-                       "wQ": queenRookScore,
-                       "wR": queenRookScore,
-                       "bQ": queenRookScore,
-                       "bR": queenRookScore,
-                       "wN": knightScore,
-                       "bN": knightScore,
-                       "wB": bishopScore,
-                       "bB": bishopScore,
-                       "wp": whitePawnScore,
-                       "bp": whitePawnScore[::-1],
-                       "wK": kingScore,
-                       "bK": kingScore[::-1]
-                       }
\ No newline at end of file
+"""
+The position score table of every piece, built from the tables above.  Black's pawn and king tables are white's flipped.
+"""
+def buildPiecePositionScores():
+    return {"wQ": queenRookScore, "wR": queenRookScore, "bQ": queenRookScore, "bR": queenRookScore,
+            "wN": knightScore, "bN": knightScore, "wB": bishopScore, "bB": bishopScore,
+            "wp": whitePawnScore, "bp": whitePawnScore[::-1], "wK": kingScore, "bK": kingScore[::-1]}
+
+
+"""
+pieceScore + 0.1 * position score for every piece on every square, combined once so the evaluation can be updated with
+one lookup per square.  pieceSquareScores[piece][row * 8 + col]; +ve for white pieces, -ve for black.
+"""
+def buildPieceSquareScores():
+    return {piece: [(1 if piece[0] == 'w' else -1) * (pieceScore[piece[1]] + piecePositionScores[piece][r][c] * .1)
+                    for r in range(8) for c in range(8)]
+            for piece in piecePositionScores}
+
+
+"""
+Rebuilds the combined tables after pieceScore or one of the position score tables has been replaced.  Modules that
+imported the combined tables by name must be rebound to the returned ones.
+"""
+def rebuildTables():
+    global piecePositionScores, pieceSquareScores
+    piecePositionScores = buildPiecePositionScores()
+    pieceSquareScores = buildPieceSquareScores()
+    return piecePositionScores, pieceSquareScores
+
+
+piecePositionScores = buildPiecePositionScores()
+pieceSquareScores = buildPieceSquareScores()
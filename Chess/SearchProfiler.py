@@ -0,0 +1,130 @@
+"""
+Profiles single searches, for finding out why a move took long.  Turned on with ChessAI.PROFILE_SEARCH; when it is off
+nothing here runs.  Only the search is profiled (not pygame or the GUI), and for every search two files are written to
+PROFILE_DIR:
+
+ - search-NNN.txt     the position and result, the time spent in each part of the engine (move generation, pins and
+                      checks, attack tests, make/undo move, evaluation, move ordering, transposition table) and the
+                      busiest engine functions, from cProfile
+ - search-NNN.folded  collapsed stacks ("caller;callee;... count" per line) sampled every SAMPLE_INTERVAL seconds, for
+                      flamegraph.pl or speedscope
+
+cProfile slows the search down a few times over, so profiled searches reach less depth in the same time.  The sampler
+runs in a thread and python only lets it in between the search's bytecodes every few milliseconds, so the sample rate is
+lower than SAMPLE_INTERVAL asks for.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+
+PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.001
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_FUNCTION = "runSearch"  # sampled stacks start here, frames above it belong to the caller
+
+# the parts of the engine a search's time is split into: (name, function names, module file or None for any)
+HOT_PATHS = (
+    ("getValidMoves", ("getValidMoves", "getStagedMoves", "prepareMoveGeneration", "generateMoves",
+                       "getAllPossibleMoves", "getPawnMoves", "getRookMoves", "getKnightMoves", "getBishopMoves",
+                       "getQueenMoves", "getKingMoves", "getSlidingMoves", "getCastleMoves", "getKingSideCastleMoves",
+                       "getQueenSideCastleMoves", "getEnemyAttacks", "enpassantIsLegal", "pinnedPieces",
+                       "attackersOf", "leavesKingSafe"), None),
+    ("checkForPinsAndChecks", ("checkForPinsAndChecks",), None),
+    ("squareUnderAttack", ("squareUnderAttack",), None),
+    ("makeMove/undoMove", ("makeMove", "undoMove", "makeNullMove", "undoNullMove", "toggleMove"), None),
+    ("scoreBoard", ("scoreBoard", "scoreBoardFromScratch"), None),
+    ("move ordering", ("captureScore", "quietScore", "moveScore", "sortMoves", "storeCutoff"), "MoveOrdering.py"),
+    ("transposition table", ("probe", "store"), "TranspositionTable.py"),
+)
+
+searchCount = 0
+
+
+"""
+Samples the stack of one thread until stopped.  counts holds how often each collapsed stack was seen.
+"""
+class StackSampler(threading.Thread):
+    def __init__(self, threadId, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.threadId = threadId
+        self.interval = interval
+        self.counts = Counter()
+        self.stopEvent = threading.Event()
+
+    def run(self):
+        while not self.stopEvent.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}.{code.co_name}")
+                if code.co_name == ROOT_FUNCTION:
+                    break
+                frame = frame.f_back
+            if stack and stack[-1].endswith("." + ROOT_FUNCTION):
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopEvent.set()
+        self.join()
+
+
+"""
+Runs search(gs, *args) (SearchContext.runSearch) under cProfile and the stack sampler, writes the report and the collapsed
+stacks, and returns what the search returned: (bestMove, stats).
+"""
+def profileSearch(search, gs, *args):
+    global searchCount
+    searchCount += 1
+    fen = gs.getFen()
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    profiler.enable()
+    try:
+        bestMove, stats = search(gs, *args)
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = os.path.join(PROFILE_DIR, f"search-{searchCount:03d}")
+    with open(name + ".folded", "w") as foldedFile:
+        for stack, count in sorted(sampler.counts.items()):
+            foldedFile.write(f"{stack} {count}\n")
+    with open(name + ".txt", "w") as reportFile:
+        writeReport(reportFile, profiler, fen, bestMove, stats, sum(sampler.counts.values()))
+    return bestMove, stats
+
+
+"""
+The per-move report: the position, the result, the time in each hot path and the 30 engine functions with the most
+time of their own.
+"""
+def writeReport(reportFile, profiler, fen, bestMove, stats, samples):
+    profileStats = pstats.Stats(profiler)
+    engineFunctions = {function: timing for function, timing in profileStats.stats.items()
+                       if os.path.dirname(os.path.abspath(function[0])) == ENGINE_DIR}
+    totalTime = sum(timing[2] for timing in profileStats.stats.values())  # own time of everything profiled
+
+    reportFile.write(f"position: {fen}\n")
+    reportFile.write(f"move: {bestMove.getChessNotation() if bestMove is not None else None}     "
+                     f"depth: {stats.depth}     nodes: {stats.nodes}     time: {stats.elapsed:.2f}s (profiled)     "
+                     f"samples: {samples}\n\n")
+
+    reportFile.write(f"{'hot path':24}{'own time':>10}{'share':>8}{'calls':>12}\n")
+    for pathName, functionNames, moduleFile in HOT_PATHS:
+        timings = [timing for function, timing in engineFunctions.items() if function[2] in functionNames
+                   and (moduleFile is None or os.path.basename(function[0]) == moduleFile)]
+        ownTime = sum(timing[2] for timing in timings)
+        calls = sum(timing[1] for timing in timings)
+        reportFile.write(f"{pathName:24}{ownTime:10.3f}{ownTime / totalTime if totalTime else 0:8.1%}{calls:12}\n")
+
+    reportFile.write(f"\n{'function':48}{'calls':>10}{'own time':>10}{'total time':>12}\n")
+    busiest = sorted(engineFunctions.items(), key=lambda item: -item[1][2])[:30]
+    for (path, line, functionName), (primitiveCalls, calls, ownTime, cumulativeTime, callers) in busiest:
+        label = f"{os.path.basename(path)}:{line}({functionName})"
+        reportFile.write(f"{label:48}{calls:10}{ownTime:10.3f}{cumulativeTime:12.3f}\n")
@@ -0,0 +1,133 @@
+"""
+Statistics of one search, returned with the best move by ChessAI.searchBestMove:
+
+ - nodes, and the nodes of each completed iteration (nodesPerDepth)
+ - the effective branching factor: how many times more nodes the last iteration took than the one before
+ - the beta cutoff rate (cutoffs per node that searched moves) and the share of cutoffs made by the first move searched,
+   which shows how good the move ordering is
+ - transposition table probes, hits and the hits that ended the search of a node
+ - re-searches: moves that beat a null window and root searches that fell outside the aspiration window
+ - nodes cut off by null move pruning, moves searched with late move reductions and reduced moves searched again
+ - the principal variation
+ - time spent generating moves and evaluating leaves, only measured when timed is True (timing every node slows the
+   search down)
+ - nodes per second, and the nodes searched by each process when the search ran in parallel
+
+Nothing is printed: the search logs the summary to the "ChessAI" logger, and toDict/toJson give the numbers in a
+structured form.
+"""
+import json
+import time
+
+COUNTERS = ("nodes", "interiorNodes", "betaCutoffs", "firstMoveCutoffs", "ttProbes", "ttHits", "ttCutoffs",
+            "researches", "aspirationResearches", "nullMovePrunes", "lateMoveReductions", "lmrResearches", "moveGenTime",
+            "evalTime")
+
+
+class SearchStats:
+    def __init__(self, timed=False):
+        self.timed = timed
+        self.nodes = 0
+        self.interiorNodes = 0  # nodes that searched at least one move
+        self.betaCutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0
+        self.researches = 0  # moves searched again with the full window after beating a null window
+        self.aspirationResearches = 0  # root searches repeated after the score fell outside the aspiration window
+        self.nullMovePrunes = 0  # nodes cut off by a null move search
+        self.lateMoveReductions = 0  # moves searched with reduced depth
+        self.lmrResearches = 0  # reduced moves searched again to full depth
+        self.moveGenTime = 0.0
+        self.evalTime = 0.0
+        self.nodesPerDepth = []
+        self.workerNodes = {}  # nodes searched by each process, keyed by "main" or the worker's pid
+        self.source = "search"  # or "book", "tablebase"
+        self.depth = 0
+        self.score = None
+        self.bestMove = None
+        self.pv = []  # principal variation in long algebraic notation
+        self.startTime = time.time()
+        self.elapsed = 0.0
+
+    """
+    Adds the counts of a search worker's stats.
+    """
+    def add(self, other):
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def finish(self, bestMove, score, depth, pv=()):
+        self.bestMove = bestMove.getChessNotation() if bestMove is not None else None
+        self.pv = [move.getChessNotation() for move in pv]
+        self.score, self.depth = score, depth
+        self.elapsed = time.time() - self.startTime
+
+    def effectiveBranchingFactor(self):
+        if len(self.nodesPerDepth) < 2 or self.nodesPerDepth[-2] == 0:
+            return None
+        return self.nodesPerDepth[-1] / self.nodesPerDepth[-2]
+
+    def cutoffRate(self):
+        return self.betaCutoffs / self.interiorNodes if self.interiorNodes else None
+
+    def firstMoveCutoffRate(self):
+        return self.firstMoveCutoffs / self.betaCutoffs if self.betaCutoffs else None
+
+    def ttHitRate(self):
+        return self.ttHits / self.ttProbes if self.ttProbes else None
+
+    def nps(self):
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    def toDict(self):
+        def rounded(value, digits=4):
+            return round(value, digits) if value is not None else None
+        return {
+            "source": self.source,
+            "bestMove": self.bestMove,
+            "pv": self.pv,
+            "score": rounded(self.score),
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "nodesPerDepth": self.nodesPerDepth,
+            "ebf": rounded(self.effectiveBranchingFactor(), 2),
+            "cutoffRate": rounded(self.cutoffRate()),
+            "firstMoveCutoffRate": rounded(self.firstMoveCutoffRate()),
+            "ttProbes": self.ttProbes,
+            "ttHitRate": rounded(self.ttHitRate()),
+            "ttCutoffs": self.ttCutoffs,
+            "researches": self.researches,
+            "aspirationResearches": self.aspirationResearches,
+            "nullMovePrunes": self.nullMovePrunes,
+            "lateMoveReductions": self.lateMoveReductions,
+            "lmrResearches": self.lmrResearches,
+            "moveGenTime": rounded(self.moveGenTime) if self.timed else None,
+            "evalTime": rounded(self.evalTime) if self.timed else None,
+            "time": rounded(self.elapsed),
+            "nps": self.nps(),
+            "workerNodes": {str(worker): nodes for worker, nodes in self.workerNodes.items()},
+        }
+
+    def toJson(self):
+        return json.dumps(self.toDict())
+
+    """
+    One line for the log.
+    """
+    def summary(self):
+        def percent(value):
+            return f"{value:.0%}" if value is not None else "-"
+        ebf = self.effectiveBranchingFactor()
+        line = (f"move: {self.bestMove}     score: {self.score if self.score is None else round(self.score, 3)}     "
+                f"depth: {self.depth}     nodes: {self.nodes}     ebf: {f'{ebf:.2f}' if ebf is not None else '-'}     "
+                f"cutoffs: {percent(self.cutoffRate())}     first move cutoffs: {percent(self.firstMoveCutoffRate())}     "
+                f"tt hits: {percent(self.ttHitRate())}     re-searches: {self.researches}/{self.aspirationResearches}     "
+                f"null move prunes: {self.nullMovePrunes}     lmr: {self.lateMoveReductions}/{self.lmrResearches}     "
+                f"nps: {self.nps()}     Time: {self.elapsed:.2f}     pv: {' '.join(self.pv)}")
+        if self.timed:
+            line += f"     movegen: {self.moveGenTime:.2f}s     eval: {self.evalTime:.2f}s"
+        if self.workerNodes:
+            line += "     nodes per process: " + ", ".join(f"{worker}: {nodes}" for worker, nodes in self.workerNodes.items())
+        return line
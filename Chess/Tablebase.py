@@ -0,0 +1,503 @@
+"""
+Endgame tablebases: every position of a small material set (KQK, KRK, KPK, or 4 man sets such as KQKR) solved by
+retrograde analysis, starting from the checkmates and working backwards one ply at a time.  A table is stored in
+tablebases/<name>.bin as one byte per position, the distance to mate for the side to move:
+
+    0         draw
+    1-127     the side to move mates in that many plies
+    128-254   the side to move is mated in (value - 128) plies
+    255       not a legal position, or one stored under a symmetric twin
+
+A table is named by the white pieces then the black pieces, the stronger side as white (KQKR); a position where black
+has the material is looked up with the colours swapped.  Positions are indexed by the squares of the pieces, white king
+first, and the side to move.  Boards without pawns are turned so the white king is in the a1-d1-d4 triangle, boards
+with pawns are mirrored so it is on the a-d files.  Captures and promotions lead into smaller tables, which are generated
+first.  Castling and en passant are not covered, and pawns only promote to queens, like the rest of the engine.
+
+A 3 man table takes seconds to generate, a 4 man table several minutes: it is all python.
+
+Usage:  python Tablebase.py generate KQK KRK KPK
+        python Tablebase.py probe FEN
+        python Tablebase.py verify KQK [--positions N]
+"""
+import os
+import random
+import sys
+from AttackTables import ORTHOGONALS, DIAGONALS, RAY_SQUARES, KNIGHT_SQUARES, KING_SQUARES, PAWN_ATTACK_SQUARES
+
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+DRAW = 0
+LOSS = 128  # LOSS + n: mated in n plies
+INVALID = 255
+PIECE_VALUES = {'K': 0, 'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+PIECE_ORDER = "KQRBNP"  # order of the letters in a table name
+
+tables = {}  # name: Tablebase, or None if there is no file for it
+availableNames = None  # names of the tables on disk, see largestTable
+
+
+def _symmetry(transform):
+    return tuple((7 - k) * 8 + f for f, k in (transform(sq & 7, 7 - (sq >> 3)) for sq in range(64)))
+
+
+# (file, rank) transforms of the board, the first two keep the pawns' direction
+SYMMETRIES = tuple(_symmetry(transform) for transform in (
+    lambda f, k: (f, k), lambda f, k: (7 - f, k), lambda f, k: (f, 7 - k), lambda f, k: (7 - f, 7 - k),
+    lambda f, k: (k, f), lambda f, k: (7 - k, f), lambda f, k: (k, 7 - f), lambda f, k: (7 - k, 7 - f)))
+TRIANGLE = tuple(sq for sq in range(64) if (7 - (sq >> 3)) <= (sq & 7) <= 3)  # a1-d1-d4, for the white king
+LEFT_HALF = tuple(sq for sq in range(64) if (sq & 7) <= 3)  # a-d files, for the white king when there are pawns
+
+# LINES[a][b]: the direction (index into RAY_SQUARES) from square a to square b, or -1 if they are not on a line
+LINES = tuple(tuple(next((j for j in range(8) if b in RAY_SQUARES[a][j]), -1) for b in range(64)) for a in range(64))
+SLIDER_DIRECTIONS = {'Q': range(8), 'R': ORTHOGONALS, 'B': DIAGONALS}
+KING_SETS = tuple(frozenset(squares) for squares in KING_SQUARES)
+KNIGHT_SETS = tuple(frozenset(squares) for squares in KNIGHT_SQUARES)
+PAWN_ATTACK_SETS = {color: tuple(frozenset(squares) for squares in PAWN_ATTACK_SQUARES[color]) for color in "wb"}
+PAWN_STEPS = {'w': -8, 'b': 8}  # square index change of a pawn push, white pawns move up the board
+PAWN_START_ROWS = {'w': 6, 'b': 1}
+PROMOTION_ROWS = {'w': 0, 'b': 7}
+
+
+"""
+A value seen from the other side, one ply earlier: mated in n -> mates in n + 1, mates in n -> mated in n + 1.
+"""
+def parentValue(value):
+    if value == DRAW:
+        return DRAW
+    return value + 1 + LOSS if value < LOSS else value - LOSS + 1
+
+
+"""
+Sort key of a value for the side to move: any win beats a draw, which beats any loss.  Quicker wins and slower losses
+are better.
+"""
+def valueRank(value):
+    if value == DRAW:
+        return 0
+    return 1000 - value if value < LOSS else value - 1000
+
+
+def encodeLevel(plies):
+    if plies > LOSS - 2:
+        raise ValueError(f"distance to mate {plies} does not fit in a byte")
+    return plies if plies & 1 else LOSS + plies
+
+
+"""
+The table name and whether the colours have to be swapped, for a position with the given white and black pieces
+(letters, kings included).  The side with more material is put first.
+"""
+def tableName(white, black):
+    white = "".join(sorted(white, key=PIECE_ORDER.index))
+    black = "".join(sorted(black, key=PIECE_ORDER.index))
+    whiteKey = (sum(PIECE_VALUES[piece] for piece in white), len(white), [-PIECE_ORDER.index(piece) for piece in white])
+    blackKey = (sum(PIECE_VALUES[piece] for piece in black), len(black), [-PIECE_ORDER.index(piece) for piece in black])
+    if blackKey > whiteKey:
+        return black + white, True
+    return white + black, False
+
+
+def splitName(name):
+    second = name.index("K", 1)
+    return name[:second], name[second:]
+
+
+def pieceCode(color, letter):
+    return color + ('p' if letter == 'P' else letter)
+
+
+"""
+Does a piece (code such as 'wQ') on fromSq attack target?  occupied holds the squares with a piece on.
+"""
+def attacks(code, fromSq, target, occupied):
+    kind = code[1]
+    if kind == 'K':
+        return target in KING_SETS[fromSq]
+    if kind == 'N':
+        return target in KNIGHT_SETS[fromSq]
+    if kind == 'p':
+        return target in PAWN_ATTACK_SETS[code[0]][fromSq]
+    direction = LINES[fromSq][target]
+    if direction not in SLIDER_DIRECTIONS[kind]:
+        return False
+    for sq in RAY_SQUARES[fromSq][direction]:
+        if sq == target:
+            return True
+        if sq in occupied:
+            return False
+
+
+"""
+Is the king of color in check?  pieces is a list of (code, square).
+"""
+def inCheck(color, pieces, occupied):
+    kingSq = next(sq for code, sq in pieces if code == color + 'K')
+    return any(code[0] != color and attacks(code, sq, kingSq, occupied) for code, sq in pieces)
+
+
+"""
+Yields (pieces after the move, True if it was a capture or promotion) for every legal move of color.
+"""
+def legalMoves(pieces, color):
+    occupied = {sq: code for code, sq in pieces}
+    for i, (code, fromSq) in enumerate(pieces):
+        if code[0] != color:
+            continue
+        kind = code[1]
+        if kind == 'K':
+            targets = KING_SQUARES[fromSq]
+        elif kind == 'N':
+            targets = KNIGHT_SQUARES[fromSq]
+        elif kind == 'p':
+            step = PAWN_STEPS[color]
+            targets = [sq for sq in PAWN_ATTACK_SQUARES[color][fromSq] if sq in occupied and occupied[sq][0] != color]
+            if fromSq + step not in occupied:
+                targets.append(fromSq + step)
+                if fromSq >> 3 == PAWN_START_ROWS[color] and fromSq + 2 * step not in occupied:
+                    targets.append(fromSq + 2 * step)
+        else:
+            targets = []
+            for direction in SLIDER_DIRECTIONS[kind]:
+                for sq in RAY_SQUARES[fromSq][direction]:
+                    targets.append(sq)
+                    if sq in occupied:
+                        break
+        for toSq in targets:
+            captured = occupied.get(toSq)
+            if captured is not None and captured[0] == color:
+                continue
+            newCode = pieceCode(color, 'Q') if kind == 'p' and toSq >> 3 == PROMOTION_ROWS[color] else code
+            newPieces = [(newCode, toSq) if j == i else piece for j, piece in enumerate(pieces) if piece[1] != toSq]
+            newOccupied = {sq for piece, sq in newPieces}
+            if not inCheck(color, newPieces, newOccupied):
+                yield newPieces, captured is not None or newCode != code
+
+
+"""
+Yields the positions color could have moved from to reach pieces, without capturing or promoting.
+"""
+def retroMoves(pieces, color):
+    occupied = {sq for code, sq in pieces}
+    for i, (code, toSq) in enumerate(pieces):
+        if code[0] != color:
+            continue
+        kind = code[1]
+        if kind == 'K':
+            sources = [sq for sq in KING_SQUARES[toSq] if sq not in occupied]
+        elif kind == 'N':
+            sources = [sq for sq in KNIGHT_SQUARES[toSq] if sq not in occupied]
+        elif kind == 'p':
+            step = PAWN_STEPS[color]
+            sources = []
+            fromSq = toSq - step
+            if fromSq not in occupied and fromSq >> 3 not in (0, 7):
+                sources.append(fromSq)
+                if fromSq >> 3 == PAWN_START_ROWS[color] + (step >> 3) and fromSq - step not in occupied:
+                    sources.append(fromSq - step)
+        else:
+            sources = []
+            for direction in SLIDER_DIRECTIONS[kind]:
+                for sq in RAY_SQUARES[toSq][direction]:
+                    if sq in occupied:
+                        break
+                    sources.append(sq)
+        for fromSq in sources:
+            yield [(code, fromSq) if j == i else piece for j, piece in enumerate(pieces)]
+
+
+class Tablebase:
+    def __init__(self, name, values=None):
+        self.name = name
+        white, black = splitName(name)
+        self.codes = [pieceCode('w', letter) for letter in white] + [pieceCode('b', letter) for letter in black]
+        self.hasPawns = 'P' in name
+        self.kingSquares = LEFT_HALF if self.hasPawns else TRIANGLE
+        self.kingSlot = {sq: slot for slot, sq in enumerate(self.kingSquares)}
+        symmetries = SYMMETRIES[:2] if self.hasPawns else SYMMETRIES
+        self.kingSymmetries = [[symmetry for symmetry in symmetries if symmetry[sq] in self.kingSlot] for sq in range(64)]
+        self.size = len(self.kingSquares) * 64 ** (len(self.codes) - 1) * 2
+        self.values = values
+
+    """
+    The index of a position given as the squares of the pieces, in the order of self.codes.  stm is 0 if white is to
+    move, 1 if black.  Of the symmetric twins of a position the one with the lowest index is used.
+    """
+    def index(self, squares, stm):
+        best = None
+        for symmetry in self.kingSymmetries[squares[0]]:
+            index = self.kingSlot[symmetry[squares[0]]]
+            for sq in squares[1:]:
+                index = index * 64 + symmetry[sq]
+            if best is None or index < best:
+                best = index
+        return best * 2 + stm
+
+    def decode(self, index):
+        stm, index = index & 1, index >> 1
+        squares = []
+        for i in range(len(self.codes) - 1):
+            squares.append(index & 63)
+            index >>= 6
+        squares.append(self.kingSquares[index])
+        return squares[::-1], stm
+
+    """
+    The index of a position given as (code, square) pieces of this table's material, colours already matching.
+    """
+    def pieceIndex(self, pieces, stm):
+        remaining = list(pieces)
+        squares = []
+        for code in self.codes:
+            for piece in remaining:
+                if piece[0] == code:
+                    squares.append(piece[1])
+                    remaining.remove(piece)
+                    break
+        return self.index(squares, stm)
+
+    """
+    Solves every position.  The tables that captures and promotions lead into must be available.
+    """
+    def generate(self):
+        codes, colors = self.codes, "wb"
+        values = bytearray(self.size)
+        remaining = bytearray(self.size)  # moves to positions in this table not yet known to lose for the side to move
+        conversions = bytearray([INVALID]) * self.size  # best value reached through a capture or promotion
+        levels = {}  # plies: positions whose distance to mate may be that many plies
+
+        for index in range(self.size):
+            squares, stm = self.decode(index)
+            pieces = list(zip(codes, squares))
+            occupied = set(squares)
+            if len(occupied) < len(squares) or self.index(squares, stm) != index \
+                    or any(code[1] == 'p' and sq >> 3 in (0, 7) for code, sq in pieces) \
+                    or inCheck(colors[stm ^ 1], pieces, occupied):
+                values[index] = INVALID
+                continue
+            children, best = set(), INVALID
+            for newPieces, converted in legalMoves(pieces, colors[stm]):
+                if converted:
+                    value = parentValue(probePieces(newPieces, stm ^ 1, generate=True))
+                    if best == INVALID or valueRank(value) > valueRank(best):
+                        best = value
+                else:
+                    children.add(self.index([sq for code, sq in newPieces], stm ^ 1))
+            remaining[index], conversions[index] = len(children), best
+            if not children and best == INVALID:  # no legal moves
+                if inCheck(colors[stm], pieces, occupied):
+                    levels.setdefault(0, []).append(index)  # checkmate; stalemate stays a draw
+            elif best != INVALID and (best < LOSS or not children) and best != DRAW:
+                levels.setdefault(best if best < LOSS else best - LOSS, []).append(index)
+
+        plies = 0
+        while levels:
+            for index in levels.pop(plies, []):
+                if values[index] != DRAW:  # already solved at fewer plies
+                    continue
+                values[index] = encodeLevel(plies)
+                squares, stm = self.decode(index)
+                parents = {self.index([sq for code, sq in parent], stm ^ 1)
+                           for parent in retroMoves(list(zip(codes, squares)), colors[stm ^ 1])}
+                for parent in parents:
+                    if values[parent] != DRAW:
+                        continue
+                    if not plies & 1:  # this position is lost, so moving into it wins
+                        levels.setdefault(plies + 1, []).append(parent)
+                        continue
+                    remaining[parent] -= 1
+                    best = conversions[parent]
+                    if remaining[parent] == 0 and best >= LOSS:  # every move loses
+                        lossPlies = plies + 1 if best == INVALID else max(plies + 1, best - LOSS)
+                        levels.setdefault(lossPlies, []).append(parent)
+            plies += 1
+        self.values = values
+
+    def save(self):
+        os.makedirs(TABLEBASE_DIR, exist_ok=True)
+        with open(os.path.join(TABLEBASE_DIR, self.name + ".bin"), "wb") as tableFile:
+            tableFile.write(self.values)
+
+
+"""
+Loads a table from TABLEBASE_DIR, or generates (and saves) it with the tables it depends on when generate is True.
+Returns None if it is not available.
+"""
+def getTable(name, generate=False):
+    if name not in tables or (tables[name] is None and generate):
+        path = os.path.join(TABLEBASE_DIR, name + ".bin")
+        if os.path.exists(path):
+            with open(path, "rb") as tableFile:
+                tables[name] = Tablebase(name, tableFile.read())
+        elif generate:
+            table = Tablebase(name)
+            for subName in subTables(name):
+                getTable(subName, generate=True)
+            table.generate()
+            table.save()
+            tables[name] = table
+        else:
+            tables[name] = None
+    return tables[name]
+
+
+"""
+The names of the tables captures and promotions from a table lead into.
+"""
+def subTables(name):
+    white, black = splitName(name)
+    names = set()
+    for side, other, swap in ((white, black, False), (black, white, True)):
+        for i, letter in enumerate(side):
+            changes = [side[:i] + side[i + 1:]] if letter != 'K' else []
+            if letter == 'P':
+                changes.append(side[:i] + "Q" + side[i + 1:])
+            for changed in changes:
+                subName, flipped = tableName(other, changed) if swap else tableName(changed, other)
+                if len(subName) > 2:
+                    names.add(subName)
+    return sorted(names)
+
+
+"""
+The value of a position for the side to move (stm 0 = white, 1 = black), given as a list of (code, square) pieces.
+Returns None if there is no table for the material.
+"""
+def probePieces(pieces, stm, generate=False):
+    white = [code[1].upper() for code, sq in pieces if code[0] == 'w']
+    black = [code[1].upper() for code, sq in pieces if code[0] == 'b']
+    if len(pieces) == 2:  # bare kings
+        return DRAW
+    name, flip = tableName(white, black)
+    if flip:
+        pieces = [(('b' if code[0] == 'w' else 'w') + code[1], sq ^ 56) for code, sq in pieces]
+        stm ^= 1
+    table = getTable(name, generate)
+    if table is None:
+        return None
+    return table.values[table.pieceIndex(pieces, stm)]
+
+
+"""
+The number of pieces (kings included) of the largest table on disk, 0 if there are none.  Positions with more pieces
+need not be probed.
+"""
+def largestTable():
+    global availableNames
+    if availableNames is None:
+        names = os.listdir(TABLEBASE_DIR) if os.path.isdir(TABLEBASE_DIR) else []
+        availableNames = {name[:-4] for name in names if name.endswith(".bin")}
+    return max((len(name) for name in availableNames), default=0)
+
+
+"""
+The tablebase value of a GameState's position for the side to move, or None if it is not covered (no table for the
+material, castling rights left, or an en passant capture possible).
+"""
+def probe(gs):
+    if gs.castleRights:
+        return None
+    color = 'w' if gs.whiteToMove else 'b'
+    pieces = [(gs.board[r][c], r * 8 + c) for r in range(8) for c in range(8) if gs.board[r][c] != "--"]
+    if gs.enpassantPossible != () and any(code == color + 'p' for code, sq in pieces):
+        return None
+    return probePieces(pieces, 0 if gs.whiteToMove else 1)
+
+
+"""
+The best move in validMoves by the tablebases, with its value for the side to move, or (None, None) if a move leads
+to a position that is not covered.
+"""
+def bestMove(gs, validMoves):
+    best, bestValue = None, None
+    for move in validMoves:
+        gs.makeMove(move)
+        value = probe(gs)
+        gs.undoMove()
+        if value is None:
+            return None, None
+        value = parentValue(value)
+        if best is None or valueRank(value) > valueRank(bestValue):
+            best, bestValue = move, value
+    return best, bestValue
+
+
+def describe(value):
+    if value == DRAW:
+        return "draw"
+    if value == INVALID:
+        return "illegal position"
+    return f"mate in {value} plies" if value < LOSS else f"mated in {value - LOSS} plies"
+
+
+def fenFromPieces(pieces, stm):
+    board = [["--"] * 8 for r in range(8)]
+    for code, sq in pieces:
+        board[sq >> 3][sq & 7] = code
+    ranks = []
+    for row in board:
+        rank, empty = "", 0
+        for square in row:
+            if square == "--":
+                empty += 1
+                continue
+            rank += (str(empty) if empty else "") + (square[1].upper() if square[0] == 'w' else square[1].lower())
+            empty = 0
+        ranks.append(rank + (str(empty) if empty else ""))
+    return "/".join(ranks) + (" w" if stm == 0 else " b") + " - - 0 1"
+
+
+"""
+Checks a table against GameState's move generator on random positions: a mated position must be checkmate, and
+every other value must follow from the values of the positions after its legal moves.
+"""
+def verify(name, positions=1000, rng=random):
+    from ChessGameState import GameState
+    table = getTable(name)
+    if table is None:
+        print(f"no table {name} in {TABLEBASE_DIR}")
+        return False
+    checked = failures = 0
+    while checked < positions:
+        index = rng.randrange(table.size)
+        if table.values[index] == INVALID:
+            continue
+        squares, stm = table.decode(index)
+        fen = fenFromPieces(list(zip(table.codes, squares)), stm)
+        gs = GameState(fen)
+        validMoves = gs.getValidMoves()
+        move, value = bestMove(gs, validMoves)
+        expected = table.values[index]
+        if not validMoves:
+            value = LOSS if gs.inCheck else DRAW
+        if value != expected:
+            failures += 1
+            print(f"{fen}: table says {describe(expected)}, the moves give {describe(value)}")
+        checked += 1
+    print(f"{name}: {checked} positions checked, {failures} wrong")
+    return failures == 0
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "generate":
+        for name in argv[1:]:
+            name, flipped = tableName(*splitName(name.upper()))
+            table = getTable(name, generate=True)
+            solved = sum(1 for value in table.values if value not in (DRAW, INVALID))
+            longest = max((value for value in table.values if value < LOSS), default=0)
+            print(f"{name}: {table.size} positions, {solved} won or lost, longest mate {longest} plies")
+        return 0
+    if len(argv) >= 2 and argv[0] == "probe":
+        from ChessGameState import GameState
+        gs = GameState(" ".join(argv[1:]))
+        value = probe(gs)
+        print(describe(value) if value is not None else "position not covered by the tablebases")
+        return 0
+    if len(argv) >= 2 and argv[0] == "verify":
+        positions = int(argv[argv.index("--positions") + 1]) if "--positions" in argv else 1000
+        return 0 if verify(argv[1].upper(), positions) else 1
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
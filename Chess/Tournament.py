@@ -0,0 +1,443 @@
+"""
+Headless engine-vs-engine tournament.  Plays two engine configurations against each other over many games at once on a
+process pool, without a board or pygame.  Every opening is played twice with the colours swapped.  Games are adjudicated
+on checkmate, stalemate, threefold repetition, the 50 move rule, bare kings and a maximum length.
+
+The match stops early once an SPRT between two Elo hypotheses is decided, or (without --sprt) once the confidence
+interval of the Elo difference no longer contains 0.  It reports games/sec, W/D/L from engine A's side, the Elo estimate
+and the average nodes/sec of each side.
+
+An engine configuration is a comma separated list of key=value pairs: name, depth, movetime (seconds per move), nodes,
+and any Module.attribute to override while that engine moves, e.g. ChessAI.TT_SIZE_MB=8 or
+PieceScores.knightScore=[[...]] (values are Python literals).  Each engine keeps its own GameState, transposition
+table and move ordering tables.  Overriding PieceScores tables rebuilds the combined evaluation table makeMove reads and
+rescores that engine's position, so it only affects that engine.
+
+Usage:  python Tournament.py --a depth=3 --b depth=2 [--games N] [--workers N] [--sprt elo0 elo1] [--alpha 0.05]
+                             [--beta 0.05] [--confidence 0.95] [--openings file] [--max-plies N]
+        python Tournament.py --check    check that evaluation table overrides change what an engine sees
+"""
+import ast
+import importlib
+import math
+import sys
+import time
+from multiprocessing import Pool
+import ChessAI
+import ChessGameState
+import PieceScores
+from ChessGameState import GameState
+from Perft import playMoves
+
+# short, balanced openings in long algebraic notation; each is played once with each colour
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 g8f6 c2c4 e7e6",
+    "c2c4 e7e5 b1c3 g8f6",
+    "g1f3 d7d5 g2g3 g8f6",
+    "e2e4 e7e5 f1c4 g8f6",
+    "d2d4 d7d5 g1f3 g8f6",
+    "e2e4 d7d5 e4d5 d8d5",
+]
+MAX_PLIES = 300  # games still going after this many plies are drawn
+WIN, DRAW, LOSS = 1, 0.5, 0
+
+
+"""
+A player in the tournament: its search limits and the module attributes it overrides.
+"""
+class EngineConfig:
+    def __init__(self, name, maxDepth=None, moveTime=None, maxNodes=None, settings=None):
+        self.name = name
+        self.maxDepth = maxDepth
+        self.moveTime = moveTime
+        self.maxNodes = maxNodes
+        self.settings = settings or {}
+
+    def limits(self):
+        return ChessAI.SearchLimits(maxDepth=self.maxDepth, moveTime=self.moveTime, maxNodes=self.maxNodes)
+
+
+"""
+Splits a configuration at the commas outside brackets, so values can be list or dict literals.
+"""
+def splitConfigItems(text):
+    items, start, nesting = [], 0, 0
+    for i, char in enumerate(text):
+        if char in "([{":
+            nesting += 1
+        elif char in ")]}":
+            nesting -= 1
+        elif char == "," and nesting == 0:
+            items.append(text[start:i])
+            start = i + 1
+    items.append(text[start:])
+    return items
+
+
+"""
+Parses "name=d3,depth=3,ChessAI.TT_SIZE_MB=8" into an EngineConfig.
+"""
+def parseEngineConfig(text, defaultName):
+    options, settings = {}, {}
+    for item in filter(None, splitConfigItems(text)):
+        key, value = item.split("=", 1)
+        if "." in key:
+            settings[key] = ast.literal_eval(value)
+        else:
+            options[key] = value
+    return EngineConfig(options.get("name", defaultName),
+                        maxDepth=int(options["depth"]) if "depth" in options else None,
+                        moveTime=float(options["movetime"]) if "movetime" in options else None,
+                        maxNodes=int(options["nodes"]) if "nodes" in options else None,
+                        settings=settings)
+
+
+"""
+One engine in one game: its own position, search tables and the module attributes it overrides.
+"""
+class Player:
+    def __init__(self, config, defaults, opening):
+        self.config = config
+        self.defaults = defaults
+        self.evalOverrides = any(key.startswith("PieceScores.") for key in defaults)
+        self.gs = GameState()
+        self.activate()
+        self.context = ChessAI.SearchContext(workers=1)  # a game already runs in a pool worker
+        playMoves(self.gs, opening)
+        self.nodes, self.searchTime = 0, 0.0
+
+    """
+    Puts this engine's overrides (and everything the other engine overrides back to its default) into the modules.
+    The evaluation is read from a table combined from the PieceScores tables and imported by name, so when either engine
+    overrides one of them the combined table is rebuilt and rebound, and this engine's position rescored with it.
+    """
+    def activate(self):
+        for key, value in self.defaults.items():
+            setModuleAttribute(key, value)
+        for key, value in self.config.settings.items():
+            setModuleAttribute(key, value)
+        if self.evalOverrides:
+            rebuildEvaluationTables()
+            self.gs.boardScore = self.gs.computeBoardScore()
+
+    def search(self):
+        self.activate()
+        startTime = time.time()
+        move, stats = self.context.search(self.gs, self.gs.getValidMoves(), self.config.limits())
+        self.searchTime += time.time() - startTime
+        self.nodes += stats.nodes
+        return move
+
+    def makeMove(self, packed):
+        self.activate()
+        for move in self.gs.getValidMoves():
+            if move.packed == packed:
+                self.gs.makeMove(move)
+                return
+
+
+"""
+Rebuilds the combined evaluation table from the current PieceScores tables and rebinds it where it was imported by name.
+"""
+def rebuildEvaluationTables():
+    piecePositionScores, pieceSquareScores = PieceScores.rebuildTables()
+    ChessGameState.pieceSquareScores = pieceSquareScores
+    ChessAI.piecePositionScores, ChessAI.pieceScore = piecePositionScores, PieceScores.pieceScore
+
+
+def getModuleAttribute(key):
+    moduleName, attribute = key.rsplit(".", 1)
+    return getattr(importlib.import_module(moduleName), attribute)
+
+
+def setModuleAttribute(key, value):
+    moduleName, attribute = key.rsplit(".", 1)
+    setattr(importlib.import_module(moduleName), attribute, value)
+
+
+"""
+Why the game is over, or None.  Looks at gs from the side to move, whose legal moves are validMoves.
+"""
+def adjudicate(gs, validMoves, maxPlies):
+    if not validMoves:
+        return "checkmate" if gs.inCheck else "stalemate"
+    if gs.halfmoveClock >= 100:
+        return "50 move rule"
+    if gs.repetitions() >= 3:
+        return "repetition"
+    if all(piece in ("--", "wK", "bK") for row in gs.board for piece in row):
+        return "bare kings"
+    if len(gs.moveLog) >= maxPlies:
+        return "max plies"
+    return None
+
+
+"""
+Plays one game in a pool worker.  Returns a result dictionary; score is from engine A's side (1 win, 0.5 draw, 0 loss).
+"""
+def playGame(task):
+    gameNumber, configA, configB, opening, aIsWhite, maxPlies = task
+    defaults = {key: getModuleAttribute(key) for key in set(configA.settings) | set(configB.settings)}
+    players = [Player(configA, defaults, opening), Player(configB, defaults, opening)]
+    white, black = (players[0], players[1]) if aIsWhite else (players[1], players[0])
+    referee = GameState()
+    playMoves(referee, opening)
+    startTime = time.time()
+    while True:
+        validMoves = referee.getValidMoves()
+        reason = adjudicate(referee, validMoves, maxPlies)
+        if reason is not None:
+            break
+        mover = white if referee.whiteToMove else black
+        move = mover.search()
+        if move is None:
+            move = validMoves[0]
+        for player in players:
+            player.makeMove(move.packed)
+        referee.makeMove(next(legal for legal in validMoves if legal.packed == move.packed))
+
+    # a pool worker plays more games, and the next one reads its defaults from the modules
+    for key, value in defaults.items():
+        setModuleAttribute(key, value)
+    if players[0].evalOverrides:
+        rebuildEvaluationTables()
+
+    if reason == "checkmate":
+        whiteScore = LOSS if referee.whiteToMove else WIN
+    else:
+        whiteScore = DRAW
+    return {
+        "game": gameNumber,
+        "opening": " ".join(opening),
+        "aIsWhite": aIsWhite,
+        "score": whiteScore if aIsWhite else 1 - whiteScore,
+        "reason": reason,
+        "plies": len(referee.moveLog),
+        "time": time.time() - startTime,
+        "nodes": (players[0].nodes, players[1].nodes),
+        "searchTime": (players[0].searchTime, players[1].searchTime),
+    }
+
+
+"""
+Elo difference for an expected score between 0 and 1.
+"""
+def eloFromScore(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def scoreFromElo(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+"""
+Mean score per game and its variance from W/D/L.
+"""
+def scoreStatistics(wins, draws, losses):
+    games = wins + draws + losses
+    mean = (wins + draws / 2) / games
+    variance = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * mean ** 2) / games
+    return mean, variance
+
+
+"""
+Log likelihood ratio of H1 (Elo difference elo1) against H0 (elo0), with the normal approximation used by the usual
+engine testing tools.
+"""
+def sprtLLR(wins, draws, losses, elo0, elo1):
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+    mean, variance = scoreStatistics(wins, draws, losses)
+    if variance == 0:
+        return 0.0
+    s0, s1 = scoreFromElo(elo0), scoreFromElo(elo1)
+    return (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance / games)
+
+
+"""
+Elo estimate and confidence interval (lower, elo, upper) from W/D/L.
+"""
+def eloInterval(wins, draws, losses, confidence=0.95):
+    games = wins + draws + losses
+    mean, variance = scoreStatistics(wins, draws, losses)
+    z = math.sqrt(2) * inverseErf(confidence)
+    margin = z * math.sqrt(variance / games)
+    return eloFromScore(mean - margin), eloFromScore(mean), eloFromScore(mean + margin)
+
+
+def inverseErf(y):
+    low, high = 0.0, 10.0
+    for i in range(100):  # bisection is plenty for a confidence level
+        middle = (low + high) / 2
+        if math.erf(middle) < y:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+"""
+Plays the match and returns the report dictionary.  sprt is (elo0, elo1) or None.
+"""
+def runTournament(configA, configB, games=100, workers=1, openings=OPENINGS, sprt=None, alpha=0.05, beta=0.05,
+                  confidence=0.95, maxPlies=MAX_PLIES, minGames=10):
+    tasks = []
+    for gameNumber in range(games):
+        opening = openings[(gameNumber // 2) % len(openings)].split()
+        tasks.append((gameNumber, configA, configB, opening, gameNumber % 2 == 0, maxPlies))
+
+    lowerBound, upperBound = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    wins = draws = losses = 0
+    nodes, searchTime = [0, 0], [0.0, 0.0]
+    reasons = {}
+    stopReason = "all games played"
+    startTime = time.time()
+    pool = Pool(workers)
+    try:
+        for result in pool.imap_unordered(playGame, tasks):
+            if result["score"] == WIN:
+                wins += 1
+            elif result["score"] == LOSS:
+                losses += 1
+            else:
+                draws += 1
+            reasons[result["reason"]] = reasons.get(result["reason"], 0) + 1
+            for side in (0, 1):
+                nodes[side] += result["nodes"][side]
+                searchTime[side] += result["searchTime"][side]
+            played = wins + draws + losses
+            lower, elo, upper = eloInterval(wins, draws, losses, confidence)
+            print(f"game {played}: {configA.name} {wins}-{draws}-{losses} {configB.name}     elo: {elo:.0f} "
+                  f"[{lower:.0f}, {upper:.0f}]     {result['reason']} after {result['plies']} plies")
+            if sprt is not None:
+                llr = sprtLLR(wins, draws, losses, sprt[0], sprt[1])
+                if llr >= upperBound:
+                    stopReason = f"SPRT accepted H1 (elo >= {sprt[1]}), LLR {llr:.2f}"
+                    break
+                if llr <= lowerBound:
+                    stopReason = f"SPRT accepted H0 (elo <= {sprt[0]}), LLR {llr:.2f}"
+                    break
+            elif played >= minGames and (lower > 0 or upper < 0):
+                stopReason = f"Elo {confidence:.0%} confidence interval excludes 0"
+                break
+    finally:
+        pool.terminate()
+    elapsed = time.time() - startTime
+
+    played = wins + draws + losses
+    lower, elo, upper = eloInterval(wins, draws, losses, confidence) if played else (0, 0, 0)
+    return {
+        "engines": (configA.name, configB.name),
+        "games": played,
+        "wins": wins, "draws": draws, "losses": losses,
+        "elo": elo, "eloInterval": (lower, upper),
+        "stopReason": stopReason,
+        "reasons": reasons,
+        "time": elapsed,
+        "gamesPerSecond": played / elapsed if elapsed > 0 else 0,
+        "nps": tuple(nodes[side] / searchTime[side] if searchTime[side] > 0 else 0 for side in (0, 1)),
+    }
+
+
+"""
+Checks that evaluation table overrides reach the engine: an engine that values no material must score a position, and
+search it, differently from one with the default tables, and the defaults must be back once the other engine is active.
+"""
+def checkEvalOverrides():
+    ChessAI.USE_OPENING_BOOK = False
+    opening = "e2e4 d7d5 e4d5".split()  # white is a pawn up
+    plain = EngineConfig("plain", maxDepth=3)
+    noMaterial = parseEngineConfig('name=noMaterial,depth=3,PieceScores.pieceScore={"K": 0, "Q": 0, "R": 0, "B": 0, '
+                                   '"N": 0, "p": 0}', "noMaterial")
+    defaults = {key: getModuleAttribute(key) for key in noMaterial.settings}
+    players = [Player(plain, defaults, opening), Player(noMaterial, defaults, opening)]
+    scores, moves, nodes = [], [], []
+    for player in players:
+        player.activate()
+        scores.append(player.gs.boardScore)
+        if abs(player.gs.boardScore - player.gs.computeBoardScore()) > 1e-9:
+            print(f"{player.config.name}: boardScore {player.gs.boardScore} was not rescored with its tables")
+            return False
+        move = player.search()
+        moves.append(move.getChessNotation())
+        nodes.append(player.nodes)
+    for player, score, move, count in zip(players, scores, moves, nodes):
+        print(f"{player.config.name:>10}: boardScore {score:8.3f}   move {move}   nodes {count}")
+    players[0].activate()
+    restored = players[0].gs.boardScore == scores[0] and ChessGameState.pieceSquareScores["wQ"][0] != 0
+    ok = scores[0] != scores[1] and (moves[0], nodes[0]) != (moves[1], nodes[1]) and restored
+    print("ok" if ok else "FAILED: the override did not change the evaluation")
+    return ok
+
+
+def loadOpenings(path):
+    with open(path) as openingFile:
+        return [line.strip() for line in openingFile if line.strip() and not line.startswith("#")]
+
+
+def main(argv):
+    configA, configB = EngineConfig("A", maxDepth=3), EngineConfig("B", maxDepth=2)
+    games, workers, sprt, alpha, beta, confidence = 100, 1, None, 0.05, 0.05, 0.95
+    openings, maxPlies = OPENINGS, MAX_PLIES
+    if argv and argv[0] == "--check":
+        return 0 if checkEvalOverrides() else 1
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--a":
+            i += 1
+            configA = parseEngineConfig(argv[i], "A")
+        elif arg == "--b":
+            i += 1
+            configB = parseEngineConfig(argv[i], "B")
+        elif arg == "--games":
+            i += 1
+            games = int(argv[i])
+        elif arg == "--workers":
+            i += 1
+            workers = int(argv[i])
+        elif arg == "--sprt":
+            sprt = (float(argv[i + 1]), float(argv[i + 2]))
+            i += 2
+        elif arg == "--alpha":
+            i += 1
+            alpha = float(argv[i])
+        elif arg == "--beta":
+            i += 1
+            beta = float(argv[i])
+        elif arg == "--confidence":
+            i += 1
+            confidence = float(argv[i])
+        elif arg == "--openings":
+            i += 1
+            openings = loadOpenings(argv[i])
+        elif arg == "--max-plies":
+            i += 1
+            maxPlies = int(argv[i])
+        else:
+            print(__doc__)
+            return 1
+        i += 1
+
+    report = runTournament(configA, configB, games, workers, openings, sprt, alpha, beta, confidence, maxPlies)
+    lower, upper = report["eloInterval"]
+    print()
+    print(f"{report['engines'][0]} vs {report['engines'][1]}: {report['wins']}-{report['draws']}-{report['losses']} "
+          f"(W-D-L) in {report['games']} games     elo: {report['elo']:.0f} [{lower:.0f}, {upper:.0f}]")
+    print(f"stopped: {report['stopReason']}")
+    print(f"endings: " + ", ".join(f"{reason} {count}" for reason, count in sorted(report["reasons"].items())))
+    print(f"games/sec: {report['gamesPerSecond']:.3f}     Time: {report['time']:.2f}s")
+    print(f"nps: {report['engines'][0]} {report['nps'][0]:.0f}     {report['engines'][1]} {report['nps'][1]:.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
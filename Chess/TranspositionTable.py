@@ -0,0 +1,112 @@
+"""
+Transposition table for the search.  Remembers the result of searching a position (keyed by its Zobrist key) so the same
+position reached through a different move order is not searched again, and so the best move found last time can be
+searched first.
+
+The table is a fixed number of buckets held in flat, preallocated arrays, sized from a memory budget in MB.  Each
+bucket has two slots: a depth-preferred slot that keeps the deepest (or most recent search's) result, and an
+always-replace slot that takes everything else.
+"""
+import sys
+from array import array
+
+# bound types: is the stored score the exact value, or only a lower/upper bound on it
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+NO_MOVE = -1
+
+# typecodes of the per-slot arrays: key, score, move (packed moves fit in 23 bits), depth, bound, age
+KEY_TYPE, SCORE_TYPE, MOVE_TYPE, DEPTH_TYPE, BOUND_TYPE, AGE_TYPE = 'Q', 'd', 'i', 'b', 'B', 'B'
+ENTRY_BYTES = sum(array(typecode).itemsize for typecode in (KEY_TYPE, SCORE_TYPE, MOVE_TYPE, DEPTH_TYPE, BOUND_TYPE, AGE_TYPE))
+
+
+class TranspositionTable:
+    def __init__(self, sizeMB=32):
+        entries = max(2, int(sizeMB * 1024 * 1024) // ENTRY_BYTES)
+        self.numBuckets = 1 << ((entries // 2).bit_length() - 1)  # round down to a power of 2 so the index is a mask
+        self.mask = self.numBuckets - 1
+        size = self.numBuckets * 2
+
+        self.keys = array(KEY_TYPE, [0]) * size
+        self.scores = array(SCORE_TYPE, [0]) * size
+        self.moves = array(MOVE_TYPE, [NO_MOVE]) * size
+        self.depths = array(DEPTH_TYPE, [-1]) * size  # depth -1 marks an empty slot
+        self.bounds = array(BOUND_TYPE, [0]) * size
+        self.ages = array(AGE_TYPE, [0]) * size
+        self.age = 0
+
+    """
+    Called at the start of every search.  Entries from older searches may be overwritten by shallower new ones.
+    """
+    def newSearch(self):
+        self.age = (self.age + 1) & 0xFF
+
+    """
+    Empties the table.
+    """
+    def clear(self):
+        size = self.numBuckets * 2
+        self.depths = array(DEPTH_TYPE, [-1]) * size
+        self.moves = array(MOVE_TYPE, [NO_MOVE]) * size
+        self.age = 0
+
+    """
+    Looks up a position.  Returns (depth, bound, score, move) or None if the position is not stored.
+    """
+    def probe(self, key):
+        i = (key & self.mask) << 1
+        if self.keys[i] == key and self.depths[i] >= 0:
+            return self.depths[i], self.bounds[i], self.scores[i], self.moves[i]
+        i += 1
+        if self.keys[i] == key and self.depths[i] >= 0:
+            return self.depths[i], self.bounds[i], self.scores[i], self.moves[i]
+        return None
+
+    """
+    Stores the result of searching a position.  The depth-preferred slot is replaced if the new result is at least as
+    deep, is for the same position, or the stored entry is from an older search.  Otherwise the result goes in the
+    always-replace slot.
+    """
+    def store(self, key, depth, bound, score, move):
+        i = (key & self.mask) << 1
+        if not (depth >= self.depths[i] or self.keys[i] == key or self.ages[i] != self.age):
+            i += 1
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.bounds[i] = bound
+        self.scores[i] = score
+        self.moves[i] = move
+        self.ages[i] = self.age
+
+    """
+    Permille of the depth-preferred slots used in the current search (UCI's hashfull).
+    """
+    def hashfull(self):
+        sample = min(1000, self.numBuckets)
+        return sum(1 for b in range(sample) if self.depths[b << 1] >= 0 and self.ages[b << 1] == self.age) * 1000 // sample
+
+    """
+    Bytes held by the table's arrays.
+    """
+    def sizeBytes(self):
+        return sum(a.buffer_info()[1] * a.itemsize for a in (self.keys, self.scores, self.moves, self.depths, self.bounds,
+                                                              self.ages))
+
+
+"""
+Checks that tables of several sizes stay within their memory budget.
+"""
+def checkSizes(sizesMB=(1, 8, 32, 48, 100)):
+    ok = True
+    for sizeMB in sizesMB:
+        tt = TranspositionTable(sizeMB)
+        used = tt.sizeBytes()
+        fits = used <= sizeMB * 1024 * 1024
+        ok = ok and fits
+        print(f"{sizeMB:>4} MB: {tt.numBuckets * 2:>9} entries, {used / (1024 * 1024):7.2f} MB  {'OK' if fits else 'TOO BIG'}")
+    return ok
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--check"]:
+        sys.exit(0 if checkSizes() else 1)
+    print("Usage:  python TranspositionTable.py --check    check that tables stay within their memory budget")
@@ -0,0 +1,32 @@
+"""
+Random 64 bit keys for Zobrist hashing.  A position's key is the XOR of the keys of every piece on its square, the side
+to move, the castling rights and the en passant file, so makeMove/undoMove can update it with a few XORs.
+The keys come from a fixed seed so every process (and every file written with them) agrees on a position's key.
+"""
+import random
+
+_random = random.Random(0x5EED)
+
+PIECES = ["wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"]
+
+pieceKeys = {piece: [_random.getrandbits(64) for sq in range(64)] for piece in PIECES}  # pieceKeys[piece][row * 8 + col]
+blackToMoveKey = _random.getrandbits(64)
+castleKeys = [_random.getrandbits(64) for rights in range(16)]  # indexed by GameState.castleRights
+enpassantKeys = [_random.getrandbits(64) for col in range(8)]  # indexed by the en passant square's column
+
+
+"""
+Calculates the key of a GameState from scratch.
+"""
+def computeKey(gs):
+    key = 0
+    for r in range(8):
+        for c in range(8):
+            if gs.board[r][c] != "--":
+                key ^= pieceKeys[gs.board[r][c]][r * 8 + c]
+    if not gs.whiteToMove:
+        key ^= blackToMoveKey
+    key ^= castleKeys[gs.castleRights]
+    if gs.enpassantPossible != ():
+        key ^= enpassantKeys[gs.enpassantPossible[0]]
+    return key